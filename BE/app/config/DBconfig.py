@@ -3,15 +3,15 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from .Settings import settings # 설정 객체 임포트
 
-# 비동기식 MySQL URL (aiomysql 사용)
-ASYNC_SQLALCHEMY_DATABASE_URL = (
+# 비동기식 MySQL URL (aiomysql 사용), DATABASE_URL이 있으면 우선
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL or (
     f"mysql+aiomysql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 )
 
 # 비동기식 엔진 및 세션
 async_engine = create_async_engine(
     ASYNC_SQLALCHEMY_DATABASE_URL,
-    echo=True,         # SQL 출력 (디버깅용)
+    echo=settings.DB_ECHO,  # SQL 출력 (디버깅용)
     pool_size=10,      # 연결 풀 설정
     max_overflow=20
 )
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,7 +7,106 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     QDRANT_HOST: str
     QDRANT_PORT: int
+
+    # OpenAI HTTP 연결 풀 (프로세스 전역으로 공유되는 httpx.AsyncClient)
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_HTTP2: bool = True
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_READ_TIMEOUT: float = 60.0
+    OPENAI_WRITE_TIMEOUT: float = 10.0
+    OPENAI_POOL_TIMEOUT: float = 5.0
+
+    # 임베딩 백엔드: openai | local (sentence-transformers, CPU) | hashing (결정적, 테스트용)
+    # 전처리(kakao_preprocess.py --embedding-provider)와 같은 값이어야 함
+    EMBEDDING_PROVIDER: str = "openai"
+    EMBEDDING_DIMENSIONS: Optional[int] = None  # openai: 모델 기본 차원 대신 사용할 차원
+    LOCAL_EMBEDDING_MODEL_PATH: str = "models/embedding"
+    LOCAL_EMBEDDING_BACKEND: str = "torch"  # torch | onnx
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 32
+    LOCAL_EMBEDDING_THREADS: int = 1
+    HASHING_EMBEDDING_DIM: int = 256
+
+    # 질의 임베딩 캐시 (LRU + TTL, 선택적으로 SQLite 영속화)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 5000
+    EMBEDDING_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    EMBEDDING_CACHE_SQLITE_PATH: Optional[str] = None
+
+    # 임베딩 micro-batching (동시 요청을 모아 한 번의 embeddings.create로 전송)
+    # 진행 중인 배치가 없으면 바로 보내므로 단독 요청에는 window 지연이 없음
+    EMBEDDING_BATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+
+    # 의미 기반 답변 캐시 (opt-in, 유사 질문이면 LLM 호출 생략)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_PER_USER: bool = True
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2000
+    SEMANTIC_CACHE_MAX_AGE_SECONDS: float = 3600.0
+
+    # 동일 (user_id, message) 동시 요청을 하나의 파이프라인으로 합침
+    CHAT_COALESCE_ENABLED: bool = True
+
+    # 채팅 기록 write-behind 저장 (응답 후 백그라운드에서 일괄 INSERT)
+    CHAT_WRITE_BEHIND_ENABLED: bool = False
+    CHAT_WRITE_QUEUE_MAXSIZE: int = 1000
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    CHAT_WRITE_FLUSH_INTERVAL_MS: float = 50.0
+    CHAT_WRITE_ENQUEUE_TIMEOUT: float = 1.0
+    CHAT_WRITE_CLOSE_TIMEOUT: float = 10.0  # 종료 시 남은 행 저장을 기다리는 최대 시간(초)
+
+    # 사용자별 최근 대화 링 버퍼 (opt-in, 프로세스 메모리)
+    # 버퍼는 같은 프로세스의 쓰기만 보므로 워커가 1개일 때만 정확합니다. 워커가 여러 개면 요청을 받은
+    # 워커에 따라 서로 다른(오래된) 기록을 돌려주게 되므로, 켜려면 워커 수를 --workers 대신
+    # WEB_CONCURRENCY 환경 변수로 지정하세요. (uvicorn/gunicorn도 같은 변수를 읽어 설정과 항상 일치)
+    HISTORY_BUFFER_ENABLED: bool = False
+    HISTORY_BUFFER_MAX_USERS: int = 10000
+    HISTORY_BUFFER_MAX_CHARS: int = 20_000_000
+    # WEB_CONCURRENCY 환경 변수 (uvicorn/gunicorn 워커 수, 2 이상이면 버퍼 비활성화)
+    WEB_CONCURRENCY: int = 1
+
+    # 프롬프트 토큰 예산 (시스템 프롬프트 + 대화 기록 + 최근 대화 + 질문)
+    PROMPT_TOKEN_BUDGET: int = 3000
+    PROMPT_CONTEXT_SHARE: float = 0.6  # 남은 예산 중 검색된 대화 기록에 먼저 배정할 비율
+
+    # 벡터 검색 백엔드: "qdrant" 또는 "local" (전처리에서 만든 파일을 메모리에 올려 검색)
+    VECTOR_BACKEND: str = "qdrant"
+    LOCAL_INDEX_PATH: str = "processed_data/local_index"
+    LOCAL_INDEX_IVF_LISTS: int = 0   # 0이면 정확 검색, 그 이상이면 IVF 근사 검색
+    LOCAL_INDEX_IVF_NPROBE: int = 8
+
+    # Qdrant 연결 풀 (앱 수명 동안 공유되는 클라이언트)
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: float = 10.0
+    QDRANT_MAX_CONNECTIONS: int = 100
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    QDRANT_KEEPALIVE_EXPIRY: float = 30.0
+    # 시작 시 Qdrant 연결 재시도 (compose는 Qdrant가 "시작"만 되면 API를 띄우므로 아직 listen 전일 수 있음)
+    QDRANT_STARTUP_RETRIES: int = 10
+    QDRANT_STARTUP_RETRY_DELAY: float = 1.0  # 재시도마다 2배, 최대 10초
+
+    # Qdrant 검색 파라미터 (None/False면 서버 기본값)
+    QDRANT_HNSW_EF: Optional[int] = None
+    QDRANT_EXACT: bool = False
+    QDRANT_INDEXED_ONLY: bool = False
+    # 양자화된 컬렉션 검색: oversampling배 후보를 양자화 벡터로 찾고 원본 벡터로 재채점
+    QDRANT_QUANTIZATION_RESCORE: bool = True
+    QDRANT_QUANTIZATION_OVERSAMPLING: Optional[float] = 2.0
+
+    # 검색 결과 다양화 (MMR): top-k × 배수만큼 후보를 가져와 서로 겹치지 않는 k개 선택
+    MMR_ENABLED: bool = False
+    MMR_CANDIDATE_MULTIPLIER: int = 4
+    MMR_LAMBDA: float = 0.5  # 1.0이면 유사도 순, 낮을수록 다양성 우선
     
+    # 카카오톡 내보내기 시각의 UTC offset (전처리 KAKAO_TZ_OFFSET과 같은 값, 기본 KST)
+    # 시간대 없이 들어온 since/until을 이 시간대로 해석해 적재된 payload.timestamp와 맞춤
+    KAKAO_TZ_OFFSET: int = 9
+
     # Chatbot config
     MAIN_SENDER: str
 
@@ -15,6 +116,9 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: str
     DB_NAME: str
+    # 지정하면 DB_* 대신 이 URL 사용 (예: 벤치마크용 sqlite+aiosqlite:///bench.db)
+    DATABASE_URL: Optional[str] = None
+    DB_ECHO: bool = True  # SQL 출력 (디버깅용)
 
     class Config:
         env_file = ".env"
@@ -5,15 +5,22 @@ from fastapi.middleware.cors import CORSMiddleware
 import time
 import logging
 
+from app.utils.metrics import HTTP_REQUEST_SECONDS
+
 logger = logging.getLogger("uvicorn")
 
 class CustomMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        """ 요청을 로깅하고 응답 시간을 측정하는 미들웨어 """
-        start_time = time.time()
+        """ 요청을 로깅하고 응답 시간을 측정하는 미들웨어 (단조 증가 시계, 라우트 경로별 히스토그램) """
+        start_time = time.perf_counter()
 
         response = await call_next(request)
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
+        # 경로 파라미터/쿼리로 라벨이 늘어나지 않도록 실제 URL 대신 라우트 템플릿 사용
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(response.status_code)
+        ).observe(process_time)
         logger.info(f"[{request.method}] {request.url} - Time taken: {process_time:.2f}s")
         return response
 
@@ -0,0 +1,24 @@
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.DBconfig import Base
+from app.config.logging_config import logger
+
+
+def _create_missing_indexes(conn: Connection) -> None:
+    """
+    이미 존재하는 테이블에 모델에 정의된 인덱스가 없으면 추가합니다.
+    (create_all은 기존 테이블의 인덱스를 추가하지 않으므로 기존 배포 환경용)
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+            logger.info(f"인덱스 확인 완료: {table.name}.{index.name}")
+
+
+async def run_migrations(engine: AsyncEngine) -> None:
+    """앱 시작 시 테이블 생성 및 누락된 인덱스를 반영합니다."""
+    async with engine.begin() as conn:
+        # await conn.run_sync(Base.metadata.drop_all) # 필요시 기존 테이블 삭제
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
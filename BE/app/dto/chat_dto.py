@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, constr
 
@@ -10,6 +10,14 @@ from pydantic import BaseModel, Field, constr
 class ChatRequest(BaseModel):
     user_id: constr(strip_whitespace=True, min_length=1) = Field(..., description="사용자 식별자")
     message: str = Field(..., description="사용자 질문 또는 메시지")
+    # 검색 범위 제한 (선택) - Qdrant payload 필터로 서버에서 적용
+    partner: Optional[str] = Field(None, description="이 상대와의 대화에서만 검색")
+    since: Optional[datetime] = Field(None, description="이 시각 이후의 대화에서만 검색 (포함)")
+    until: Optional[datetime] = Field(None, description="이 시각 이전의 대화에서만 검색 (미포함)")
+
+    @property
+    def has_search_filter(self) -> bool:
+        return bool(self.partner) or self.since is not None or self.until is not None
 
 
 # ───────────────────────────────
@@ -39,3 +47,19 @@ class CommonResponse(BaseModel):
     code: str = Field(..., example="SUCCESS")
     message: str = Field(..., example="처리가 완료되었습니다.")
     data: Optional[ChatResponse] = None
+
+
+# ───────────────────────────────
+# 5. 대화 기록 조회 응답 (커서 페이지네이션)
+# ───────────────────────────────
+class ChatHistoryItem(BaseModel):
+    request: str
+    response: str
+    timestamp: datetime
+
+
+class ChatHistoryResponse(BaseModel):
+    code: str = Field("200", example="200")
+    message: str = Field("대화 기록 조회 완료", example="대화 기록 조회 완료")
+    data: List[ChatHistoryItem] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(None, description="다음(더 오래된) 페이지 커서, 마지막 페이지면 null")
@@ -1,24 +1,108 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routers import chat_router
+from app.routers import chat_router, metrics_router
 from app.config.middleware import setup_middleware
+from app.config.Settings import settings
+from app.repository.chat_write_queue import ChatWriteQueue
+from app.service.rag_service import RAGService
+from app.config.logging_config import logger
+from app.utils.gpt_client import aclose_clients
+from app.utils.history_buffer import RecentHistoryBuffer
+from app.utils.metrics import register_app_collector
+from app.utils.semantic_cache import SemanticCache
+from app.utils.single_flight import SingleFlight
 
 # DB 초기화 관련 임포트
-from app.config.DBconfig import async_engine, Base
+from app.config.DBconfig import AsyncSessionLocal, async_engine
+from app.config.migrations import run_migrations
 from app.models import chat_model
 
-app = FastAPI()
 
-@app.on_event("startup")
-async def startup_event():
+async def _create_rag_service() -> RAGService:
+    """
+    Qdrant가 아직 연결을 받지 않으면 지수 백오프로 재시도합니다.
+    차원 불일치/인덱스 파일 없음(ValueError, FileNotFoundError)은 기다려도 바뀌지 않으므로 바로 실패합니다.
+    """
+    attempts = max(1, settings.QDRANT_STARTUP_RETRIES)
+    delay = settings.QDRANT_STARTUP_RETRY_DELAY
+    for attempt in range(1, attempts + 1):
+        try:
+            return await RAGService.create()
+        except (ValueError, FileNotFoundError):
+            raise
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"벡터 DB 연결 실패 ({attempt}/{attempts}), {delay:.1f}초 후 재시도: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """
-    애플리케이션 시작 시 데이터베이스 테이블을 생성합니다.
+    애플리케이션 수명 주기 동안 공유 자원을 관리합니다.
+    - 시작: 데이터베이스 테이블/인덱스 생성, 공유 Qdrant 클라이언트(RAGService)·의미 기반 캐시·요청 합치기·write-behind 큐·최근 대화 버퍼 생성
+    - 종료: write-behind 큐의 남은 기록 저장, 공유 Qdrant 클라이언트 및 OpenAI HTTP 연결 풀 종료
     """
-    async with async_engine.begin() as conn:
-        # await conn.run_sync(Base.metadata.drop_all) # 필요시 기존 테이블 삭제
-        await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(async_engine)
+
+    # 요청마다 클라이언트를 만들지 않고 앱 수명 동안 하나의 연결 풀을 재사용
+    app.state.rag_service = await _create_rag_service()
+    app.state.semantic_cache = (
+        SemanticCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            max_age_seconds=settings.SEMANTIC_CACHE_MAX_AGE_SECONDS,
+            per_user=settings.SEMANTIC_CACHE_PER_USER,
+        )
+        if settings.SEMANTIC_CACHE_ENABLED
+        else None
+    )
+    app.state.chat_single_flight = SingleFlight() if settings.CHAT_COALESCE_ENABLED else None
+
+    app.state.chat_write_queue = None
+    if settings.CHAT_WRITE_BEHIND_ENABLED:
+        app.state.chat_write_queue = ChatWriteQueue(
+            AsyncSessionLocal,
+            maxsize=settings.CHAT_WRITE_QUEUE_MAXSIZE,
+            batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+            flush_interval_ms=settings.CHAT_WRITE_FLUSH_INTERVAL_MS,
+            enqueue_timeout=settings.CHAT_WRITE_ENQUEUE_TIMEOUT,
+            close_timeout=settings.CHAT_WRITE_CLOSE_TIMEOUT,
+        )
+        app.state.chat_write_queue.start()
+
+    # 최근 대화 링 버퍼는 같은 프로세스의 쓰기만 볼 수 있으므로 워커가 1개일 때만 사용
+    app.state.history_buffer = None
+    if settings.HISTORY_BUFFER_ENABLED:
+        if settings.WEB_CONCURRENCY > 1:
+            logger.info("워커가 여러 개이므로 최근 대화 버퍼를 사용하지 않습니다. (DB 조회)")
+        else:
+            app.state.history_buffer = RecentHistoryBuffer(
+                max_users=settings.HISTORY_BUFFER_MAX_USERS,
+                max_chars=settings.HISTORY_BUFFER_MAX_CHARS,
+            )
+            logger.info("최근 대화 버퍼 사용 (WEB_CONCURRENCY=1, 워커 1개 기준)")
+
+    # /metrics 수집 시 캐시 적중률·DB 연결 풀 상태를 읽어 가도록 등록
+    register_app_collector(app, async_engine)
+    try:
+        yield
+    finally:
+        if app.state.chat_write_queue is not None:
+            await app.state.chat_write_queue.aclose()
+        await app.state.rag_service.aclose()
+        await aclose_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 미들웨어 설정 (라우터 등록 전에 해야 함)
 setup_middleware(app)
 
 # 라우터 포함
 app.include_router(chat_router.router, tags=["chat"])
+app.include_router(metrics_router.router, tags=["metrics"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy import Column, String, Text, DateTime, Index
 from app.config.DBconfig import Base  # 수정: DBconfig에서 Base 임포트
 from datetime import datetime
 import uuid
@@ -6,6 +6,10 @@ import uuid
 
 class Chat(Base):
     __tablename__ = "chat"
+    __table_args__ = (
+        # 사용자별 최근 대화 조회/커서 페이지네이션용 (user_id 필터 + timestamp 정렬, InnoDB는 PK(id)를 뒤에 포함)
+        Index("ix_chat_user_id_timestamp", "user_id", "timestamp"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String(255), nullable=False)
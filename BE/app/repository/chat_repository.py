@@ -1,5 +1,9 @@
+import uuid
+from datetime import datetime
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select  # ✅ 추가
+from sqlalchemy import and_, insert, or_, select  # ✅ 추가
+from typing import Optional
 from app.models.chat_model import Chat
 from app.dto.chat_dto import ChatRequest
 from app.config.logging_config import logger
@@ -21,6 +25,23 @@ async def save_chat_message(
     await db.refresh(chat)
     return chat
 
+def new_chat_row(user_id: str, request: str, response: str) -> dict:
+    """일괄 저장용 채팅 행을 만듭니다. (id/timestamp를 미리 채워 저장 전에 응답할 수 있도록 함)"""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "request": request,
+        "response": response,
+        "timestamp": datetime.utcnow(),
+    }
+
+async def save_chat_messages_bulk(db: AsyncSession, rows: list[dict]) -> None:
+    """채팅 행 여러 개를 한 번의 multi-row INSERT로 저장"""
+    if not rows:
+        return
+    await db.execute(insert(Chat), rows)
+    await db.commit()
+
 async def get_recent_chats_by_user_id(db: AsyncSession, user_id: int, limit: int = 5) -> list[Chat]:
     """
     특정 사용자의 최근 채팅 기록을 N개 가져옵니다.
@@ -38,3 +59,28 @@ async def get_recent_chats_by_user_id(db: AsyncSession, user_id: int, limit: int
     except Exception as e:
         logger.error(f"사용자 ID({user_id})의 최근 채팅 조회 실패: {e}")
         return []
+
+async def get_chats_page_by_user_id(
+    db: AsyncSession,
+    user_id: str,
+    limit: int = 10,
+    before: Optional[tuple[datetime, str]] = None,
+) -> list[Chat]:
+    """
+    특정 사용자의 채팅 기록을 최신순으로 한 페이지 가져옵니다. (keyset 페이지네이션)
+    - before: 이전 페이지 마지막 행의 (timestamp, id). 이보다 오래된 행부터 조회
+    - OFFSET 없이 (user_id, timestamp) 인덱스를 따라가므로 깊은 페이지도 페이지 크기만큼만 읽습니다.
+    """
+    stmt = select(Chat).filter(Chat.user_id == user_id)
+    if before is not None:
+        ts, chat_id = before
+        stmt = stmt.filter(
+            or_(
+                Chat.timestamp < ts,
+                and_(Chat.timestamp == ts, Chat.id < chat_id),
+            )
+        )
+    result = await db.execute(
+        stmt.order_by(Chat.timestamp.desc(), Chat.id.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
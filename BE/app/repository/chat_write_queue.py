@@ -0,0 +1,153 @@
+# repository/chat_write_queue.py
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repository import chat_repository
+from app.config.logging_config import logger
+from app.utils.metrics import CHAT_WRITE_FLUSH_SECONDS, CHAT_WRITE_ROWS
+
+
+class ChatWriteQueue:
+    """
+    채팅 기록 write-behind 큐
+    - 응답은 즉시 반환하고, 채팅 행은 메모리 큐에 쌓은 뒤 백그라운드 태스크가 multi-row INSERT로 일괄 저장합니다.
+    - 큐 크기는 제한되며, 가득 차면 enqueue가 최대 enqueue_timeout초 동안 대기합니다. (backpressure)
+    - 종료 시 aclose()가 남은 행을 최대 close_timeout초 동안 저장합니다. (DB 장애 시 종료가 멈추지 않도록)
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        maxsize: int = 1000,
+        batch_size: int = 100,
+        flush_interval_ms: float = 50.0,
+        enqueue_timeout: float = 1.0,
+        max_attempts: int = 3,
+        close_timeout: float = 10.0,
+    ):
+        self._session_factory = session_factory
+        self._queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout
+        self.max_attempts = max_attempts
+        self.close_timeout = close_timeout
+        self._task: Optional[asyncio.Task] = None
+        # 아직 DB에 반영되지 않은 행 (큐 대기 + 저장 중), id → row. pending_rows 조회용
+        self._unsaved: Dict[str, dict] = {}
+
+        # 지표
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, row: dict) -> None:
+        """행을 큐에 넣습니다. 큐가 가득 찬 상태가 enqueue_timeout초 지속되면 asyncio.TimeoutError"""
+        # put이 끝나기 전에 백그라운드 태스크가 꺼내 저장할 수 있으므로 먼저 등록
+        self._unsaved[row["id"]] = row
+        try:
+            await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+        except BaseException:
+            self._unsaved.pop(row["id"], None)
+            raise
+        self.enqueued += 1
+
+    def pending_rows(self, user_id: str) -> List[dict]:
+        """아직 DB에 반영되지 않은(큐 대기 또는 저장 중) 특정 사용자의 행"""
+        return [r for r in list(self._unsaved.values()) if r["user_id"] == user_id]
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_seconds_avg": self.flush_seconds_total / self.flushes if self.flushes else 0.0,
+            "flush_seconds_max": self.flush_seconds_max,
+        }
+
+    async def aclose(self) -> None:
+        """
+        남은 행을 저장한 뒤 백그라운드 태스크를 종료합니다.
+        태스크가 이미 죽었거나 close_timeout 안에 저장이 끝나지 않으면 남은 행을 버리고 건수를 기록합니다.
+        """
+        if self._task is None:
+            return
+        if self._task.done():
+            error = None if self._task.cancelled() else self._task.exception()
+            logger.error(f"채팅 write-behind 저장 태스크가 이미 종료됨({error}) → 미저장 {len(self._unsaved)}건 유실")
+            self._drop(len(self._unsaved))
+        else:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self.close_timeout)
+            except asyncio.TimeoutError:
+                logger.error(
+                    f"채팅 write-behind 큐 종료 대기 {self.close_timeout}s 초과 → 미저장 {len(self._unsaved)}건 유실"
+                )
+                self._drop(len(self._unsaved))
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"채팅 write-behind 큐 종료: {self.stats()}")
+
+    # ---------------------------
+    # 내부 구현
+    # ---------------------------
+    def _drop(self, rows: int) -> None:
+        self.dropped += rows
+        CHAT_WRITE_ROWS.labels("dropped").inc(rows)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # 배치가 찰 만큼 쌓여 있지 않으면 잠시 더 모은 뒤 저장
+            if self._queue.qsize() < self.batch_size - 1 and self.flush_interval > 0:
+                await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._flush(batch)
+            finally:
+                for row in batch:
+                    self._unsaved.pop(row["id"], None)
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[dict]) -> None:
+        start = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                async with self._session_factory() as db:
+                    await chat_repository.save_chat_messages_bulk(db, batch)
+                break
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self._drop(len(batch))
+                    CHAT_WRITE_FLUSH_SECONDS.labels("failed").observe(time.perf_counter() - start)
+                    logger.error(f"채팅 {len(batch)}건 일괄 저장 최종 실패: {e}")
+                    return
+                logger.warning(f"채팅 일괄 저장 재시도 {attempt}/{self.max_attempts}: {e}")
+                await asyncio.sleep(0.1 * attempt)
+
+        elapsed = time.perf_counter() - start
+        self.written += len(batch)
+        self.flushes += 1
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        CHAT_WRITE_FLUSH_SECONDS.labels("ok").observe(elapsed)
+        CHAT_WRITE_ROWS.labels("written").inc(len(batch))
+        logger.info(f"채팅 {len(batch)}건 일괄 저장 완료 ({elapsed * 1000:.1f}ms, 대기 {self._queue.qsize()}건)")
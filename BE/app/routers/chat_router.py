@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import AsyncGenerator
 
-from app.dto.chat_dto import ChatRequest, ChatResponse
+from app.dto.chat_dto import ChatHistoryResponse, ChatRequest, ChatResponse
 from app.service.chat_service import ChatService
 from app.service.rag_service import RAGService
 from app.service.llm_service import LLMService
-from app.config.DBconfig import get_async_db
+from app.config.DBconfig import AsyncSessionLocal, get_async_db
 from app.config.Settings import settings
 
 router = APIRouter(prefix="/api/chat")
@@ -15,18 +17,23 @@ router = APIRouter(prefix="/api/chat")
 def get_llm_service() -> LLMService:
     return LLMService()
 
-async def get_rag_service() -> AsyncGenerator[RAGService, None]:
-    rag_service = await RAGService.create()
-    try:
-        yield rag_service
-    finally:
-        await rag_service.aclose()
+def get_rag_service(request: Request) -> RAGService:
+    """lifespan에서 생성한 공유 RAGService를 반환합니다. (요청마다 Qdrant 연결을 새로 만들지 않음)"""
+    return request.app.state.rag_service
 
 def get_chat_service(
+    request: Request,
     rag_service: RAGService = Depends(get_rag_service),
     llm_service: LLMService = Depends(get_llm_service)
 ) -> ChatService:
-    return ChatService(rag_service=rag_service, llm_service=llm_service)
+    return ChatService(
+        rag_service=rag_service,
+        llm_service=llm_service,
+        semantic_cache=request.app.state.semantic_cache,
+        single_flight=request.app.state.chat_single_flight,
+        write_queue=request.app.state.chat_write_queue,
+        history_buffer=request.app.state.history_buffer,
+    )
 
 @router.get("/sender")
 def get_sender():
@@ -39,3 +46,39 @@ async def chat(
     chat_service: ChatService = Depends(get_chat_service),
 ):
     return await chat_service.process_chat(request, db)
+
+@router.get("/", response_model=ChatHistoryResponse)
+async def get_chat_history(
+    user_id: str = Query(..., min_length=1, description="사용자 ID"),
+    limit: int = Query(10, ge=1, le=100, description="가져올 최대 대화 수"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor (없으면 최신부터)"),
+    db: AsyncSession = Depends(get_async_db),
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    try:
+        return await chat_service.get_history(db, user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    """
+    답변을 SSE(text/event-stream)로 토큰 단위 전송합니다.
+    요청 스코프의 DB 세션은 스트리밍 전에 정리되므로 스트림 내부에서 세션을 직접 엽니다.
+    """
+    async def event_stream():
+        async with AsyncSessionLocal() as db:
+            async for frame in chat_service.process_chat_stream(request, db):
+                yield frame
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Nginx 버퍼링 비활성화
+        },
+    )
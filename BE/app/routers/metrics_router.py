@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text format 지표 (워커 프로세스별 값)"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/metrics/semantic-cache", include_in_schema=False)
+def semantic_cache_stats(request: Request):
+    """
+    의미 기반 캐시 지표 (임계치 튜닝용)
+    /metrics와 같이 내부 전용 경로로 두어 nginx의 /api 프록시로 노출되지 않습니다.
+    """
+    cache = request.app.state.semantic_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot(), "top_entries": cache.top_entries()}
@@ -1,63 +1,305 @@
 # service/chat_service.py
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dto.chat_dto import ChatRequest, ChatResponse
-from app.service.llm_service import LLMService
+from app.dto.chat_dto import ChatHistoryItem, ChatHistoryResponse, ChatRequest, ChatResponse
+from app.service.llm_service import LLMService, LLM_ERROR_MESSAGE
 from app.service.rag_service import RAGService
+from app.utils.cursor import decode_cursor, encode_cursor
 from app.utils.gpt_client import get_embedding
+from app.utils.history_buffer import RecentHistoryBuffer, history_item_from_row
+from app.utils.metrics import observe_stages
+from app.utils.semantic_cache import SemanticCache
+from app.utils.single_flight import SingleFlight
+from app.utils.stage_timer import StageTimer
 from app.repository import chat_repository  # ⬅️ 리포지토리 임포트
+from app.repository.chat_write_queue import ChatWriteQueue
+from app.config.DBconfig import AsyncSessionLocal
 from app.config.logging_config import logger
 
+
+def _sse(event: str, data: dict) -> str:
+    """Server-Sent Events 프레임 한 개를 직렬화합니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@dataclass
+class ChatContext:
+    """LLM 호출 전에 모으는 컨텍스트"""
+    user_chat_history: List[str] = field(default_factory=list)
+    retrieved_context: List[str] = field(default_factory=list)
+    query_vector: Optional[List[float]] = None
+    cached_answer: Optional[str] = None  # 의미 기반 캐시 적중 시 재사용할 답변
+
+
 class ChatService:
-    def __init__(self, rag_service: RAGService, llm_service: LLMService):
+    def __init__(
+        self,
+        rag_service: RAGService,
+        llm_service: LLMService,
+        semantic_cache: Optional[SemanticCache] = None,
+        single_flight: Optional[SingleFlight[ChatResponse]] = None,
+        write_queue: Optional[ChatWriteQueue] = None,
+        history_buffer: Optional[RecentHistoryBuffer] = None,
+    ):
         self.rag_service = rag_service
         self.llm_service = llm_service
+        self.semantic_cache = semantic_cache
+        self.single_flight = single_flight
+        self.write_queue = write_queue
+        self.history_buffer = history_buffer
 
-    async def process_chat(
+    async def _build_context(
         self,
         request: ChatRequest,
         db: AsyncSession,
-    ) -> ChatResponse:
-        logger.info(f"[ChatService] 사용자 ID({request.user_id})로부터 채팅 요청 접수: '{request.message}'")
-  
-        # 1. 사용자 최근 대화 기록 조회 (DB 조회)
-        try:
-            recent_chats = await chat_repository.get_recent_chats_by_user_id(db, request.user_id)
-            user_chat_history = [f"Q: {c.request}\nA: {c.response}" for c in recent_chats]
-            logger.info(f"사용자 ID({request.user_id})의 최근 대화 {len(user_chat_history)}개 조회 완료")
-        except Exception as e:
-            logger.error(f"사용자 ID({request.user_id})의 최근 대화 조회 실패: {e}")
-            user_chat_history = []
+        timer: Optional[StageTimer] = None,
+    ) -> ChatContext:
+        """
+        사용자 최근 대화와 RAG 검색 결과를 조회합니다.
+        - 최근 대화 조회(DB)와 임베딩→벡터 검색은 서로 독립적이므로 동시에 실행합니다.
+        - 의미 기반 캐시가 켜져 있으면 임베딩 직후 조회하고, 적중 시 벡터 검색을 생략합니다.
+        - 각 단계는 실패 시 빈 컨텍스트로 대체합니다.
+        """
+        timer = timer or StageTimer()
+        ctx = ChatContext()
+
+        # 1. 사용자 최근 대화 기록 조회 (링 버퍼 → 없으면 DB 조회)
+        async def _history() -> None:
+            try:
+                with timer.stage("history"):
+                    if self.history_buffer is not None:
+                        ctx.user_chat_history = await self._buffered_history(db, request.user_id)
+                    else:
+                        recent_chats = await chat_repository.get_recent_chats_by_user_id(db, request.user_id)
+                        ctx.user_chat_history = [f"Q: {c.request}\nA: {c.response}" for c in recent_chats]
+                logger.info(f"사용자 ID({request.user_id})의 최근 대화 {len(ctx.user_chat_history)}개 조회 완료")
+            except Exception as e:
+                logger.error(f"사용자 ID({request.user_id})의 최근 대화 조회 실패: {e}")
 
         # 2. 관련 대화 기록 검색 (RAG)
-        try:
-            input_vector = await get_embedding(request.message)
-            retrieved_context = await self.rag_service.get_chat(input_vector)
-        except Exception as e:
-            logger.error(f"벡터 DB 조회 실패: {e}")
-            retrieved_context = []
+        async def _rag() -> None:
+            try:
+                with timer.stage("embedding"):
+                    ctx.query_vector = await get_embedding(request.message)
 
-        # 3. LLM 호출 (OpenAI)
-        try:
-            final_response = await self.llm_service.generate(request.message, retrieved_context=retrieved_context, user_chat_history=user_chat_history)
-        except Exception as e:
-            logger.error(f"LLM 호출 실패: {e}")
-            final_response = "죄송합니다. 답변을 생성하는 중에 오류가 발생했습니다."
+                # 검색 범위를 제한한 요청은 범위가 다른 답변을 재사용하지 않도록 캐시를 건너뜀
+                if self.semantic_cache is not None and not request.has_search_filter:
+                    cached = self.semantic_cache.lookup(request.user_id, ctx.query_vector)
+                    if cached is not None:
+                        ctx.cached_answer, score = cached
+                        logger.info(f"의미 기반 캐시 적중 (유사도={score:.4f}) → LLM 호출 생략")
+                        return
+
+                with timer.stage("search"):
+                    ctx.retrieved_context = await self.rag_service.get_chat(
+                        ctx.query_vector,
+                        partner=request.partner,
+                        since=request.since,
+                        until=request.until,
+                        timer=timer,
+                    )
+            except Exception as e:
+                logger.error(f"벡터 DB 조회 실패: {e}")
+
+        await asyncio.gather(_history(), _rag())
+        return ctx
+
+    async def _buffered_history(self, db: AsyncSession, user_id: str) -> List[str]:
+        """
+        링 버퍼에서 최근 대화를 가져옵니다.
+        버퍼가 없으면 DB의 최근 대화와 write-behind 큐에서 아직 저장되지 않은 행을 합쳐 채웁니다.
+        - 미저장 행은 DB 조회 전에 스냅샷합니다. (조회 중 저장된 행은 DB 결과에, 그 전 행은 스냅샷에 포함)
+        - 조회 중 새로 저장된 대화는 begin_fill() 이후의 append()로 기록되어 fill()에서 병합됩니다.
+        """
+        items = self.history_buffer.get(user_id)
+        if items is None:
+            self.history_buffer.begin_fill(user_id)
+            try:
+                pending = self.write_queue.pending_rows(user_id) if self.write_queue is not None else []
+                # 조회 실패를 빈 기록으로 착각해 버퍼를 만들지 않도록 예외를 삼키지 않는 조회 사용
+                rows = await chat_repository.get_chats_page_by_user_id(db, user_id, self.history_buffer.per_user)
+            except BaseException:
+                self.history_buffer.abort_fill(user_id)
+                raise
+            items = self.history_buffer.fill(
+                user_id, [history_item_from_row(r) for r in list(rows) + pending]
+            )
+        return RecentHistoryBuffer.to_prompt_lines(items)
+
+    def _remember_answer(self, request: ChatRequest, ctx: ChatContext, answer: str) -> None:
+        """정상 생성된 답변을 의미 기반 캐시에 저장합니다."""
+        if self.semantic_cache is None or ctx.cached_answer is not None or ctx.query_vector is None:
+            return
+        if request.has_search_filter:
+            return
+        if not answer or answer == LLM_ERROR_MESSAGE:
+            return
+        self.semantic_cache.store(request.user_id, request.message, ctx.query_vector, answer)
+
+    async def _save(self, db: AsyncSession, request: ChatRequest, final_response: str) -> ChatResponse:
+        """
+        채팅 기록을 저장하고 응답 DTO를 만듭니다.
+        write-behind 큐가 있으면 큐에 넣고 바로 반환하며, 큐가 계속 가득 차 있으면 직접 저장합니다.
+        """
+        if self.write_queue is not None:
+            row = chat_repository.new_chat_row(request.user_id, request.message, final_response)
+            try:
+                await self.write_queue.enqueue(row)
+                if self.history_buffer is not None:
+                    self.history_buffer.append(request.user_id, history_item_from_row(row))
+                return ChatResponse(
+                    user_id=row["user_id"],
+                    request_msg=row["request"],
+                    response_msg=row["response"],
+                    created_at=row["timestamp"],
+                )
+            except asyncio.TimeoutError:
+                logger.warning("채팅 write-behind 큐가 가득 차 직접 저장합니다.")
 
-        # 4. DB 저장을 위해 리포지토리 함수 호출
         chat = await chat_repository.save_chat_message(
             db=db,
             user_id=request.user_id,
             request=request.message,
-            response=final_response
+            response=final_response,
         )
-
-        # 5. DTO 반환
-        response_dto = ChatResponse(
+        if self.history_buffer is not None:
+            self.history_buffer.append(request.user_id, history_item_from_row(chat))
+        return ChatResponse(
             user_id=chat.user_id,
             request_msg=chat.request,
             response_msg=chat.response,
             created_at=chat.timestamp,
         )
 
+    async def process_chat(
+        self,
+        request: ChatRequest,
+        db: AsyncSession,
+    ) -> ChatResponse:
+        """
+        채팅 요청을 처리합니다.
+        같은 (user_id, message) 요청이 이미 처리 중이면(더블 클릭, 프록시 재시도 등) 새로 실행하지 않고
+        진행 중인 파이프라인의 결과를 공유하므로, 답변 생성과 저장은 한 번만 일어납니다.
+        공유 작업은 첫 요청이 취소/종료되어도 계속 실행되므로 요청 스코프 세션(db) 대신 전용 세션을 엽니다.
+        """
+        if self.single_flight is None:
+            return await self._process_chat(request, db)
+
+        async def _shared() -> ChatResponse:
+            async with AsyncSessionLocal() as shared_db:
+                return await self._process_chat(request, shared_db)
+
+        key = (request.user_id, request.message, request.partner, request.since, request.until)
+        if key in self.single_flight:
+            logger.info(f"[ChatService] 진행 중인 동일 요청에 합류: 사용자 ID({request.user_id})")
+        return await self.single_flight.do(key, _shared)
+
+    async def _process_chat(
+        self,
+        request: ChatRequest,
+        db: AsyncSession,
+    ) -> ChatResponse:
+        logger.info(f"[ChatService] 사용자 ID({request.user_id})로부터 채팅 요청 접수: '{request.message}'")
+        timer = StageTimer()
+
+        # 1~2. 최근 대화 + 관련 대화 기록 조회 (동시 실행)
+        ctx = await self._build_context(request, db, timer)
+
+        # 3. LLM 호출 (OpenAI) - 의미 기반 캐시 적중 시 생략
+        if ctx.cached_answer is not None:
+            final_response = ctx.cached_answer
+        else:
+            try:
+                with timer.stage("llm"):
+                    final_response = await self.llm_service.generate(request.message, retrieved_context=ctx.retrieved_context, user_chat_history=ctx.user_chat_history, timer=timer)
+                self._remember_answer(request, ctx, final_response)
+            except Exception as e:
+                logger.error(f"LLM 호출 실패: {e}")
+                final_response = "죄송합니다. 답변을 생성하는 중에 오류가 발생했습니다."
+
+        # 4. DB 저장 (write-behind 모드면 큐에 넣고 바로 반환)
+        with timer.stage("db_write"):
+            response_dto = await self._save(db, request, final_response)
+        logger.info(f"[ChatService] 단계별 소요 시간: {timer.summary()}")
+        observe_stages(timer)
+
+        # 5. DTO 반환
         logger.info(f"[ChatService] 최종 응답 반환: '{response_dto.response_msg}'")
         return response_dto
+
+    async def process_chat_stream(
+        self,
+        request: ChatRequest,
+        db: AsyncSession,
+    ) -> AsyncIterator[str]:
+        """
+        process_chat의 스트리밍 버전입니다. SSE 프레임을 순서대로 yield 합니다.
+        - token: {"delta": "..."} 답변 조각
+        - done : ChatResponse (스트림 종료 후 DB 저장까지 끝난 최종 결과)
+        - error: {"message": "..."} 저장 실패 등
+        """
+        logger.info(f"[ChatService] 사용자 ID({request.user_id})로부터 스트리밍 채팅 요청 접수: '{request.message}'")
+
+        timer = StageTimer()
+        ctx = await self._build_context(request, db, timer)
+
+        if ctx.cached_answer is not None:
+            # 의미 기반 캐시 적중: 저장된 답변을 한 번에 전달
+            final_response = ctx.cached_answer
+            yield _sse("token", {"delta": final_response})
+        else:
+            # LLM 토큰을 도착하는 즉시 전달하고, 저장을 위해 전체 답변을 모음
+            parts: List[str] = []
+            with timer.stage("llm"):
+                async for delta in self.llm_service.generate_stream(
+                    request.message,
+                    retrieved_context=ctx.retrieved_context,
+                    user_chat_history=ctx.user_chat_history,
+                    timer=timer,
+                ):
+                    parts.append(delta)
+                    yield _sse("token", {"delta": delta})
+
+            final_response = "".join(parts).strip()
+            self._remember_answer(request, ctx, final_response)
+
+        # 스트림이 끝난 뒤 조립된 답변을 저장
+        try:
+            with timer.stage("db_write"):
+                response_dto = await self._save(db, request, final_response)
+        except Exception as e:
+            logger.error(f"스트리밍 답변 저장 실패: {e}")
+            yield _sse("error", {"message": "답변을 저장하는 중 오류가 발생했습니다."})
+            return
+
+        logger.info(f"[ChatService] 스트리밍 최종 응답 저장 완료: '{response_dto.response_msg}'")
+        logger.info(f"[ChatService] 단계별 소요 시간: {timer.summary()}")
+        observe_stages(timer)
+        yield _sse("done", response_dto.model_dump(mode="json"))
+
+    async def get_history(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+    ) -> ChatHistoryResponse:
+        """사용자의 대화 기록을 최신순으로 커서 기반 페이지 단위 조회합니다. (잘못된 커서는 ValueError)"""
+        before = decode_cursor(cursor) if cursor else None
+        # 다음 페이지 존재 여부를 알기 위해 1개 더 조회
+        chats = await chat_repository.get_chats_page_by_user_id(db, user_id, limit + 1, before)
+        has_more = len(chats) > limit
+        chats = chats[:limit]
+
+        next_cursor = encode_cursor(chats[-1].timestamp, chats[-1].id) if has_more else None
+        return ChatHistoryResponse(
+            data=[
+                ChatHistoryItem(request=c.request, response=c.response, timestamp=c.timestamp)
+                for c in chats
+            ],
+            next_cursor=next_cursor,
+        )
@@ -1,41 +1,91 @@
 import os
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 from app.config.logging_config import logger
-from app.utils.gpt_client import chat_completion
+from app.utils.gpt_client import GPT_MODEL, chat_completion, chat_completion_stream
+from app.utils.stage_timer import StageTimer
+from app.utils.token_counter import count_tokens
 from app.repository.chat_repository import get_recent_chats_by_user_id
 
+# LLM 호출 실패 시 사용자에게 돌려주는 안내 문구 (캐시 저장 대상에서 제외)
+LLM_ERROR_MESSAGE = "죄송해요, 답변을 생성하는 중 오류가 발생했어요."
+
+SYSTEM_PROMPT = (
+    "당신은 나의 카카오톡 대화 기록을 기반으로 답변하는 챗봇입니다.\n"
+    "주어진 '대화 기록'과 '사용자 최근 대화'를 바탕으로 사용자의 '질문'에 대해 답변해주세요.\n"
+    "특히, '대화 기록'을 통해 나의 말투와 스타일, 답변 성향을 파악하고, 최대한 비슷하게 답변해야 합니다.\n"
+    "대화 기록에 관련 내용이 없으면 문맥과 이전 대화 기록을 바탕으로 말투를 유지해서 대답해줘.\n"
+    "이전 대화 기록을 참고해서 문맥에 맞는 대화를 해줘.\n"
+    "답변은 항상 한국어로 해줘"
+)
+NO_CONTEXT_TEXT = "관련 대화 기록을 찾지 못했습니다."
+CONTEXT_PREFIX = "- "  # 대화 기록 각 줄 앞에 붙는 글머리표
+USER_PROMPT_TEMPLATE = "[대화 기록]\n{context}\n\n[사용자 최근 대화]\n{history}\n\n[질문]\n{question}"
+
+
+def _fit_items(
+    items: List[str], budget: int, model: str, prefix: str = "", ordered: bool = True
+) -> Tuple[List[str], int]:
+    """
+    중요도 순으로 정렬된 항목을 예산(토큰) 안에서 앞에서부터 담습니다. (각 줄 앞에 붙는 prefix 포함)
+    - ordered=True (최근 대화): 예산을 넘는 항목에서 멈춰 순서가 의미 있는 목록에 중간이 빠진 구멍이 생기지 않게 합니다.
+    - ordered=False (검색된 대화 기록): 긴 항목 하나만 건너뛰고 뒤쪽의 짧은 항목으로 남은 예산을 채웁니다.
+    """
+    kept: List[str] = []
+    used = 0
+    for item in items:
+        cost = count_tokens(prefix + item, model) + 1  # 줄바꿈 구분자
+        if used + cost > budget:
+            if ordered:
+                break
+            continue
+        kept.append(item)
+        used += cost
+    return kept, used
+
+
 class LLMService:
     def __init__(self):
         self
 
-    async def _create_prompt(self, user_input: str, context: str, user_chats: list[str]) -> list:
-        """LLM에 전달할 프롬프트를 생성합니다."""
-        
-        # 사용자 대화 기록을 문자열로 변환
-        chat_history = "\n".join(user_chats)
-
-        system_prompt = f"""
-        당신은 나의 카카오톡 대화 기록을 기반으로 답변하는 챗봇입니다.
-        주어진 '대화 기록'과 '사용자 최근 대화'를 바탕으로 사용자의 '질문'에 대해 답변해주세요.
-        특히, '대화 기록'을 통해 나의 말투와 스타일, 답변 성향을 파악하고, 최대한 비슷하게 답변해야 합니다.
-        대화 기록에 관련 내용이 없으면 문맥과 이전 대화 기록을 바탕으로 말투를 유지해서 대답해줘.
-        이전 대화 기록을 참고해서 문맥에 맞는 대화를 해줘.
-        답변은 항상 한국어로 해줘 
+    async def _create_prompt(self, user_input: str, context: List[str], user_chats: List[str]) -> list:
+        """
+        LLM에 전달할 프롬프트를 토큰 예산 안에서 생성합니다.
+        - 시스템 프롬프트와 질문은 그대로 두고, 남은 예산을 검색된 대화 기록(context)과 최근 대화(history)에 나눠 배정합니다.
+        - context는 유사도 낮은 항목부터, history는 오래된 대화부터 잘라냅니다. (두 목록 모두 중요도 순으로 전달됨)
+        - 한쪽에서 남은 예산은 다른 쪽이 사용합니다.
         """
-        
-        user_prompt = f"""
-        [대화 기록]
-        {context}
+        from app.config.Settings import settings
 
-        [사용자 최근 대화]
-        {chat_history}
+        model = GPT_MODEL
+        system_tokens = count_tokens(SYSTEM_PROMPT, model)
+        fixed_tokens = count_tokens(USER_PROMPT_TEMPLATE.format(context="", history="", question=user_input), model)
+        remaining = max(settings.PROMPT_TOKEN_BUDGET - system_tokens - fixed_tokens, 0)
 
-        [질문]
-        {user_input}
-        """
+        context_kept, context_tokens = _fit_items(
+            context, int(remaining * settings.PROMPT_CONTEXT_SHARE), model, CONTEXT_PREFIX, ordered=False
+        )
+        history_kept, history_tokens = _fit_items(user_chats, remaining - context_tokens, model)
+        if len(context_kept) < len(context):
+            # 최근 대화가 쓰고 남은 예산으로 잘린 대화 기록을 다시 채움
+            context_kept, context_tokens = _fit_items(
+                context, remaining - history_tokens, model, CONTEXT_PREFIX, ordered=False
+            )
+
+        user_prompt = USER_PROMPT_TEMPLATE.format(
+            context="\n".join(CONTEXT_PREFIX + c for c in context_kept) or NO_CONTEXT_TEXT,
+            history="\n".join(history_kept),
+            question=user_input,
+        )
+        logger.info(
+            f"프롬프트 토큰: system={system_tokens}, "
+            f"context={context_tokens} ({len(context_kept)}/{len(context)}개), "
+            f"history={history_tokens} ({len(history_kept)}/{len(user_chats)}개), "
+            f"question+template={fixed_tokens}, "
+            f"total={system_tokens + fixed_tokens + context_tokens + history_tokens}/{settings.PROMPT_TOKEN_BUDGET}"
+        )
 
         messages = [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt},
         ]
         return messages
@@ -45,15 +95,17 @@ class LLMService:
             user_input: str,
             retrieved_context: List[str],
             user_chat_history: List[str],
+            timer: Optional[StageTimer] = None,
             ) -> str:
         """
-        사용자 입력을 받아 최종 답변을 생성합니다.
+        사용자 입력을 받아 최종 답변을 생성합니다. (timer가 있으면 프롬프트 생성을 'prompt' 단계로 기록)
         """
         from app.config.Settings import settings
         logger.info(f"입력 접수: '{user_input}'")
 
         # 4. 프롬프트 생성
-        messages = await self._create_prompt(user_input, retrieved_context, user_chat_history)
+        with (timer or StageTimer()).stage("prompt"):
+            messages = await self._create_prompt(user_input, retrieved_context, user_chat_history)
         logger.info(f"LLM 프롬프트 생성 완료.")
         # 로그 가독성을 위해 상세 프롬프트는 DEBUG 레벨로 기록 (현재는 INFO 레벨만 출력)
         # logger.debug(f"전체 프롬프트: {messages}") 
@@ -64,6 +116,35 @@ class LLMService:
             logger.info(f"LLM 답변 생성 완료: '{final_response}'")
         except Exception as e:
             logger.error(f"LLM 답변 생성 실패: {e}")
-            return "죄송해요, 답변을 생성하는 중 오류가 발생했어요."
+            return LLM_ERROR_MESSAGE
 
         return final_response
+
+    async def generate_stream(
+            self,
+            user_input: str,
+            retrieved_context: List[str],
+            user_chat_history: List[str],
+            timer: Optional[StageTimer] = None,
+            ) -> AsyncIterator[str]:
+        """
+        사용자 입력을 받아 답변을 토큰 단위로 스트리밍합니다.
+        - 첫 토큰 전에 실패하면 안내 문구를 한 번 yield 하고, 도중에 실패하면 그때까지의 답변으로 종료합니다.
+        """
+        from app.config.Settings import settings
+        logger.info(f"스트리밍 입력 접수: '{user_input}'")
+
+        with (timer or StageTimer()).stage("prompt"):
+            messages = await self._create_prompt(user_input, retrieved_context, user_chat_history)
+        logger.info(f"LLM 프롬프트 생성 완료.")
+
+        produced = False
+        try:
+            async for delta in chat_completion_stream(messages=messages, api_key=settings.OPENAI_API_KEY):
+                produced = True
+                yield delta
+            logger.info("LLM 스트리밍 답변 생성 완료")
+        except Exception as e:
+            logger.error(f"LLM 스트리밍 답변 생성 실패: {e}")
+            if not produced:
+                yield LLM_ERROR_MESSAGE
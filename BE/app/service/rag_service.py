@@ -1,43 +1,143 @@
 # app/services/rag_service.py
-from typing import List, Sequence
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+import httpx
+from qdrant_client.models import DatetimeRange, FieldCondition, Filter, MatchValue
 from app.config.logging_config import logger
 from app.utils.Qdrant_client import QdrantClientAsync  # ← 앞서 제공한 Async 래퍼
+from app.utils.embedding_provider import get_embedding_provider
+from app.utils.local_vector_index import LocalVectorIndex
+from app.utils.mmr import mmr_select
+from app.utils.stage_timer import StageTimer
 
 QDRANT_COLLECTION = "kakao-chat"
+RAG_TOP_K = 5  # 프롬프트에 넣을 관련 대화 수
+
+
+def _localize(value: Optional[datetime]) -> Optional[datetime]:
+    """시간대가 없는 시각은 적재 때와 같은 카카오톡 시간대(KAKAO_TZ_OFFSET, 기본 KST)로 해석"""
+    from app.config.Settings import settings
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone(timedelta(hours=settings.KAKAO_TZ_OFFSET)))
+
+
+def build_filter(
+    partner: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Optional[Filter]:
+    """
+    대화 상대/기간 조건을 Qdrant 필터로 변환합니다. (조건이 없으면 None)
+    - partner: 질문을 보낸 상대 (payload.query_sender)
+    - since/until: 답변 시각 범위 [since, until) (payload.timestamp, 시간대가 없으면 KST로 해석)
+    """
+    must = []
+    if partner:
+        must.append(FieldCondition(key="query_sender", match=MatchValue(value=partner)))
+    if since is not None or until is not None:
+        must.append(FieldCondition(key="timestamp", range=DatetimeRange(gte=_localize(since), lt=_localize(until))))
+    return Filter(must=must) if must else None
+
 
 class RAGService:
-    def __init__(self, qdrant_client: QdrantClientAsync):
+    def __init__(self, qdrant_client: QdrantClientAsync | LocalVectorIndex):
+        # QdrantClientAsync 또는 같은 search 인터페이스를 가진 LocalVectorIndex
         self.qdrant = qdrant_client
 
     @classmethod
     async def create(cls) -> "RAGService":
+        """
+        앱 수명 동안 공유할 RAGService를 생성합니다. (lifespan 시작 시 1회 호출)
+        - 연결 풀이 설정된 Qdrant 클라이언트를 만들고, 컬렉션 존재 여부를 1회만 확인합니다.
+        - VECTOR_BACKEND=local 이면 Qdrant 대신 로컬 벡터 인덱스 파일을 메모리에 올립니다.
+        - 벡터 차원은 임베딩 provider(EMBEDDING_PROVIDER)에서 가져오며, 저장된 벡터와 다르면 시작을 중단합니다. (ValueError)
+        """
         from app.config.Settings import settings
+        # 로컬 모델 로드처럼 오래 걸리는 초기화를 첫 요청이 아닌 시작 시점에 수행
+        provider = await asyncio.to_thread(get_embedding_provider)
+        if settings.VECTOR_BACKEND == "local":
+            index = await asyncio.to_thread(
+                LocalVectorIndex.load,
+                settings.LOCAL_INDEX_PATH,
+                nlist=settings.LOCAL_INDEX_IVF_LISTS,
+                nprobe=settings.LOCAL_INDEX_IVF_NPROBE,
+            )
+            if index.vectors.shape[1] != provider.dim:
+                await index.aclose()
+                raise ValueError(
+                    f"로컬 인덱스 차원({index.vectors.shape[1]})이 임베딩 차원({provider.dim}, {provider.name})과 다릅니다. "
+                    f"같은 EMBEDDING_PROVIDER로 다시 적재하세요."
+                )
+            return cls(qdrant_client=index)
+
         qc = await QdrantClientAsync.create(
             host=settings.QDRANT_HOST,
             port=settings.QDRANT_PORT,
             collection_name=QDRANT_COLLECTION,
-            prefer_grpc=False,  # HTTP만 사용 → 디버깅 쉬움
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,  # 기본은 HTTP (디버깅 쉬움)
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            timeout=settings.QDRANT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.QDRANT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.QDRANT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.QDRANT_KEEPALIVE_EXPIRY,
+            ),
             # url="https://your-domain", verify=False  # TLS 프록시 사용 시
         )
-        await qc.create_collection()  # 필요 시 1회 생성
+        try:
+            await qc.create_collection(vector_size=provider.dim)  # 앱 시작 시 1회만 확인/생성
+        except Exception:
+            await qc.aclose()
+            raise
         return cls(qdrant_client=qc)
 
     async def aclose(self) -> None:
         await self.qdrant.aclose()
 
-    async def get_chat(self, query_vector: Sequence[float]) -> str:
-        """질문 벡터로 관련 대화 기록을 검색해 컨텍스트를 문자열로 반환"""
+    async def get_chat(
+        self,
+        query_vector: Sequence[float],
+        *,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None,
+        indexed_only: Optional[bool] = None,
+        partner: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> List[str]:
+        """
+        질문 벡터로 관련 대화 기록을 검색해 컨텍스트 목록을 반환 (유사도 높은 순)
+        프롬프트 생성 시 토큰 예산에 맞춰 뒤(유사도 낮은 항목)부터 잘라냅니다.
+        검색 파라미터를 생략하면 설정(QDRANT_HNSW_EF/EXACT/INDEXED_ONLY)을 따릅니다.
+        partner/since/until은 payload 필터로 변환되어 검색 엔진 안에서 적용됩니다. (Python 후처리 없음)
+        MMR_ENABLED면 후보를 더 가져와 MMR로 비슷한 문장이 겹치지 않게 재정렬합니다. (timer에 'mmr' 단계 기록)
+        """
+        from app.config.Settings import settings
+        use_mmr = settings.MMR_ENABLED and settings.MMR_CANDIDATE_MULTIPLIER > 1
         try:
             hits = await self.qdrant.search(
                 query_vector=list(query_vector),
-                limit=5,
+                limit=RAG_TOP_K * settings.MMR_CANDIDATE_MULTIPLIER if use_mmr else RAG_TOP_K,
                 score_threshold=None,    # 필요 시 0.75 같은 임계치
-                with_vectors=False,
+                with_vectors=use_mmr,
+                hnsw_ef=settings.QDRANT_HNSW_EF if hnsw_ef is None else hnsw_ef,
+                exact=settings.QDRANT_EXACT if exact is None else exact,
+                indexed_only=settings.QDRANT_INDEXED_ONLY if indexed_only is None else indexed_only,
+                quantization_rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+                quantization_oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+                query_filter=build_filter(partner, since, until),
             )
             logger.info(f"Qdrant 검색 완료. {len(hits)}개 결과 발견.")
         except Exception as e:
             logger.error(f"Qdrant 검색 실패: {e}")
-            return "죄송해요, 대화 기록을 찾는 중 오류가 발생했어요."
+            return []
+
+        if use_mmr:
+            hits = self._rerank_mmr(query_vector, hits, settings.MMR_LAMBDA, timer or StageTimer())
 
         # ScoredPoint 리스트를 payload에서 꺼내기
         lines: List[str] = []
@@ -46,11 +146,24 @@ class RAGService:
                 payload = getattr(h, "payload", None) or {}
                 text = payload.get("content") or payload.get("text") or payload.get("body")
                 if text:
-                    lines.append(f"- {text}")
+                    lines.append(text)
             except Exception:
                 # payload 형태가 다른 경우 조용히 스킵
                 continue
 
-        retrieved_context = "\n".join(lines) if lines else "관련 대화 기록을 찾지 못했습니다."
-        logger.info(f"추출된 컨텍스트:\n{retrieved_context}")
-        return retrieved_context
+        logger.info(f"추출된 컨텍스트 {len(lines)}개: {lines}")
+        return lines
+
+    @staticmethod
+    def _rerank_mmr(query_vector: Sequence[float], hits: list, lambda_mult: float, timer: StageTimer) -> list:
+        """벡터가 있는 후보에 MMR을 적용해 RAG_TOP_K개를 고릅니다. (벡터가 없으면 유사도 순 유지)"""
+        candidates = [h for h in hits if getattr(h, "vector", None) is not None]
+        if len(candidates) != len(hits):
+            return hits[:RAG_TOP_K]
+        with timer.stage("mmr"):
+            order = mmr_select(query_vector, [h.vector for h in candidates], RAG_TOP_K, lambda_mult)
+        logger.info(
+            f"MMR 재정렬: 후보 {len(candidates)}개 → {len(order)}개 "
+            f"({timer.timings['mmr'] * 1000:.2f}ms, λ={lambda_mult})"
+        )
+        return [candidates[i] for i in order]
@@ -3,13 +3,20 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional
 
+import httpx
 from qdrant_client.async_qdrant_client import AsyncQdrantClient
 from qdrant_client.models import (
-    VectorParams, Distance, PointStruct, PointIdsList
+    VectorParams, Distance, PointStruct, PointIdsList, SearchParams,
+    QuantizationSearchParams, Filter, PayloadSchemaType,
 )
 from app.config.logging_config import logger
 
-VECTOR_DIM = 1536  # text-embedding-3-small 기준
+# 필터 검색용 payload 인덱스 (Preprocessing/kakao_preprocess.py 와 동일하게 유지)
+PAYLOAD_INDEXES = {
+    "query_sender": PayloadSchemaType.KEYWORD,
+    "response_sender": PayloadSchemaType.KEYWORD,
+    "timestamp": PayloadSchemaType.DATETIME,
+}
 
 
 class QdrantClientAsync:
@@ -36,8 +43,15 @@ class QdrantClientAsync:
         collection_name: str = "my_collection",
         verify: bool | str = True,          # 자가서명 인증서면 False(개발용) 또는 CA 경로
         prefer_grpc: bool = False,          # HTTP로 고정하면 디버깅 쉬움
+        grpc_port: int = 6334,              # prefer_grpc=True일 때 사용할 포트
         timeout: Optional[float] = 10.0,    # 요청 타임아웃(초)
+        limits: Optional[httpx.Limits] = None,  # httpx 연결 풀 제한(keep-alive 포함)
     ) -> "QdrantClientAsync":
+        # limits 미지정 시 qdrant-client는 localhost 연결의 keep-alive를 끄므로 명시적으로 전달
+        extra: Dict[str, Any] = {"grpc_port": int(grpc_port)}
+        if limits is not None:
+            extra["limits"] = limits
+
         if url:
             aclient = AsyncQdrantClient(
                 url=url,
@@ -46,6 +60,7 @@ class QdrantClientAsync:
                 timeout=timeout,
                 # httpx 옵션 전달
                 verify=verify,
+                **extra,
             )
         else:
             aclient = AsyncQdrantClient(
@@ -56,6 +71,7 @@ class QdrantClientAsync:
                 prefer_grpc=prefer_grpc,
                 timeout=timeout,
                 verify=verify,
+                **extra,
             )
         return cls(aclient=aclient, collection_name=collection_name)
 
@@ -66,23 +82,43 @@ class QdrantClientAsync:
     # ---------------------------
     # Qdrant Operations (Async)
     # ---------------------------
-    async def create_collection(self, vector_size: int = VECTOR_DIM) -> None:
-        """컬렉션이 없으면 생성."""
+    async def create_collection(self, vector_size: int) -> None:
+        """
+        컬렉션이 없으면 생성. (vector_size는 임베딩 provider의 차원)
+        payload 인덱스는 기존 컬렉션(인덱스 도입 전에 만든 컬렉션 포함)에도 항상 보장합니다.
+        기존 컬렉션의 벡터 차원이 다르면 모든 검색이 실패하므로 ValueError로 시작을 중단합니다.
+        """
         cols = await self.client.get_collections()
         existing = [c.name for c in cols.collections]
         if self.collection_name in existing:
-            return
+            info = await self.client.get_collection(self.collection_name)
+            size = getattr(info.config.params.vectors, "size", None)
+            if size is not None and size != vector_size:
+                raise ValueError(
+                    f"컬렉션 '{self.collection_name}'의 벡터 차원({size})이 임베딩 차원({vector_size})과 다릅니다. "
+                    f"같은 EMBEDDING_PROVIDER로 다시 적재하세요."
+                )
+        else:
+            logger.info(
+                f"📁 컬렉션 '{self.collection_name}' 없음 → 새로 생성(dim={vector_size})"
+            )
+            # 데이터 보존을 위해 create 사용(필요 시 recreate로 교체)
+            await self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(
+                    size=vector_size, distance=Distance.COSINE
+                ),
+            )
+        await self.create_payload_indexes()
 
-        logger.info(
-            f"📁 컬렉션 '{self.collection_name}' 없음 → 새로 생성(dim={vector_size})"
-        )
-        # 데이터 보존을 위해 create 사용(필요 시 recreate로 교체)
-        await self.client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(
-                size=vector_size, distance=Distance.COSINE
-            ),
-        )
+    async def create_payload_indexes(self) -> None:
+        """화자/시각 필터를 서버에서 인덱스로 처리하도록 payload 인덱스 생성 (이미 있으면 그대로 유지)"""
+        for field, schema in PAYLOAD_INDEXES.items():
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=schema,
+            )
 
     async def upsert_point(
         self,
@@ -112,8 +148,22 @@ class QdrantClientAsync:
         limit: int = 6,
         score_threshold: Optional[float] = None,
         with_vectors: bool = False,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        indexed_only: bool = False,
+        quantization_rescore: Optional[bool] = None,
+        quantization_oversampling: Optional[float] = None,
+        query_filter: Optional[Filter] = None,
     ):
-        """벡터 유사도 검색"""
+        """
+        벡터 유사도 검색
+        - hnsw_ef: 검색 시 탐색 후보 수 (클수록 정확하지만 느림)
+        - exact: HNSW 대신 전수 검색
+        - indexed_only: 아직 인덱싱되지 않은 세그먼트는 건너뜀 (대량 업서트 중 지연 방지)
+        - quantization_rescore / quantization_oversampling: 양자화 컬렉션에서 limit×oversampling개 후보를
+          양자화 벡터로 찾은 뒤 원본 벡터로 재채점 (양자화되지 않은 컬렉션에서는 무시됨)
+        - query_filter: payload 조건 (Qdrant 서버에서 HNSW 탐색 중에 적용)
+        """
         kwargs: Dict[str, Any] = dict(
             collection_name=self.collection_name,
             query_vector=query_vector,
@@ -123,6 +173,17 @@ class QdrantClientAsync:
         )
         if score_threshold is not None:
             kwargs["score_threshold"] = score_threshold
+        if query_filter is not None:
+            kwargs["query_filter"] = query_filter
+        quantization = None
+        if quantization_rescore is not None or quantization_oversampling is not None:
+            quantization = QuantizationSearchParams(
+                rescore=quantization_rescore, oversampling=quantization_oversampling
+            )
+        if hnsw_ef is not None or exact or indexed_only or quantization is not None:
+            kwargs["search_params"] = SearchParams(
+                hnsw_ef=hnsw_ef, exact=exact, indexed_only=indexed_only, quantization=quantization
+            )
 
         return await self.client.search(**kwargs)
 
@@ -0,0 +1,21 @@
+# utils/cursor.py
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(timestamp: datetime, chat_id: str) -> str:
+    """(timestamp, id) 위치를 URL에 안전한 불투명 커서 문자열로 인코딩합니다."""
+    raw = json.dumps([timestamp.isoformat(), chat_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """커서를 (timestamp, id)로 복원합니다. 형식이 잘못되면 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, chat_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(ts), str(chat_id)
+    except Exception as e:
+        raise ValueError(f"잘못된 커서입니다: {cursor}") from e
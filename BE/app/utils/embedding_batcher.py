@@ -0,0 +1,90 @@
+# utils/embedding_batcher.py
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+SendBatch = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """
+    여러 코루틴의 단건 임베딩 요청을 모아 한 번의 배치 호출로 보냅니다. (micro-batching)
+    - 진행 중인 배치가 없으면 바로 전송 (단독 요청은 기다리지 않음)
+    - 배치가 진행 중일 때 들어온 요청은 모아 두었다가 첫 요청 후 window_ms가 지나거나 max_batch_size개가 모이면 전송
+    - 결과는 요청 순서대로 각 대기 코루틴에 돌려주고, 실패 시 배치 전체에 같은 예외를 전달
+    - 단, 4xx(잘못된 입력) 실패는 입력 하나 때문일 수 있으므로 항목별로 다시 보내 나머지는 정상 처리
+    """
+
+    def __init__(self, send: SendBatch, window_ms: float = 5.0, max_batch_size: int = 64):
+        self._send = send
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0  # 실제 전송한 배치 수
+        self.items = 0    # 전송한 텍스트 수
+
+    async def submit(self, text: str) -> List[float]:
+        if not text or not text.strip():
+            # 빈 입력은 API가 400으로 거절하므로 배치에 섞지 않고 바로 실패
+            raise ValueError("빈 텍스트는 임베딩할 수 없습니다.")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size or not self._tasks:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def aclose(self) -> None:
+        """대기 중인 요청을 즉시 전송하고 진행 중인 배치가 끝날 때까지 기다립니다."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # 이미 취소된 대기자는 전송 대상에서 제외
+        batch = [(text, fut) for text, fut in batch if not fut.done()]
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            vectors = await self._send([text for text, _ in batch])
+        except Exception as e:
+            if len(batch) > 1 and self._is_client_error(e):
+                await asyncio.gather(*(self._send_batch([item]) for item in batch))
+                return
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        if len(vectors) != len(batch):
+            error = RuntimeError(f"임베딩 결과 수({len(vectors)})가 요청 수({len(batch)})와 다릅니다.")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(error)
+            return
+        for (_, fut), vector in zip(batch, vectors):
+            if not fut.done():
+                fut.set_result(vector)
+
+    @staticmethod
+    def _is_client_error(error: Exception) -> bool:
+        """요청 내용 때문에 거절된 4xx (429 한도 초과는 제외)"""
+        status = getattr(error, "status_code", None)
+        return isinstance(status, int) and 400 <= status < 500 and status != 429
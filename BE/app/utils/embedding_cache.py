@@ -0,0 +1,146 @@
+# utils/embedding_cache.py
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config.logging_config import logger
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (유니코드 NFC + 공백 정리)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    (model, 정규화 텍스트) → 임베딩 벡터 캐시
+    - 메모리: 최대 항목 수 기준 LRU + TTL, 벡터는 float32 ndarray로 보관
+    - 선택: SQLite 파일에 영속화하여 재시작 후에도 재사용
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        sqlite_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model      TEXT NOT NULL,
+                    text_hash  TEXT NOT NULL,
+                    dim        INTEGER NOT NULL,
+                    vector     BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+            self._db.execute(
+                "DELETE FROM embedding_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._db.commit()
+            logger.info(f"임베딩 캐시 SQLite 사용: {sqlite_path}")
+
+    # ---------------------------
+    # 조회 / 저장
+    # ---------------------------
+    async def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """캐시된 벡터를 반환합니다. 없거나 만료되었으면 None"""
+        key = (model, text)
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            created_at, vector = entry
+            if now - created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            del self._entries[key]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._db_get, model, text)
+            if row is not None and now - row[0] <= self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[1]
+
+        self.misses += 1
+        return None
+
+    async def set(self, model: str, text: str, vector) -> np.ndarray:
+        """벡터를 float32로 변환해 저장하고 변환된 배열을 반환합니다."""
+        arr = np.asarray(vector, dtype=np.float32)
+        created_at = time.time()
+        self._remember((model, text), created_at, arr)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_set, model, text, arr, created_at)
+        return arr
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    # ---------------------------
+    # 내부 구현
+    # ---------------------------
+    def _remember(self, key: Tuple[str, str], created_at: float, vector: np.ndarray) -> None:
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _db_get(self, model: str, text: str) -> Optional[Tuple[float, np.ndarray]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT created_at, vector FROM embedding_cache WHERE model = ? AND text_hash = ?",
+                (model, self._hash(text)),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], np.frombuffer(row[1], dtype=np.float32)
+
+    def _db_set(self, model: str, text: str, vector: np.ndarray, created_at: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embedding_cache (model, text_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                (model, self._hash(text), int(vector.shape[0]), vector.tobytes(), created_at),
+            )
+            self._db.commit()
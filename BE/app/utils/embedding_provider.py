@@ -0,0 +1,170 @@
+# utils/embedding_provider.py
+# 임베딩 백엔드 (EMBEDDING_PROVIDER)
+# - openai : OpenAI embeddings API (기본값)
+# - local  : 로컬 경로의 sentence-transformers 모델 (CPU, torch 또는 ONNX 백엔드), 스레드 풀에서 배치 실행
+# - hashing: 문자 n-gram feature hashing (외부 호출 없는 결정적 임베딩, 테스트/오프라인용)
+# Preprocessing/embedding_provider.py 와 name/차원/hashing 알고리즘이 같아야 적재 벡터와 질문 벡터가 같은 공간에 놓입니다.
+# 수정 후 `python -m benchmarks.check_embedding_parity` 로 두 구현이 일치하는지 확인하세요.
+import asyncio
+import hashlib
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config.logging_config import logger
+
+# 모델별 기본 차원 (dimensions 파라미터로 줄일 수 있음)
+OPENAI_EMBEDDING_DIMS: Dict[str, int] = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProvider:
+    """
+    텍스트 목록 → 임베딩 목록
+    - name: 캐시 키/메타데이터에 쓰는 식별자 (같은 name이면 같은 벡터 공간)
+    - dim : 벡터 차원 (컬렉션 생성 시 사용)
+    """
+
+    name: str
+    dim: int
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        return None
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        if dimensions is None and model not in OPENAI_EMBEDDING_DIMS:
+            raise ValueError(f"임베딩 모델 '{model}'의 차원을 알 수 없습니다. EMBEDDING_DIMENSIONS를 지정하세요.")
+        self.model = model
+        self.dimensions = dimensions
+        self.dim = dimensions or OPENAI_EMBEDDING_DIMS[model]
+        # 기존 임베딩 캐시(SQLite 포함)와 같은 키를 쓰도록 모델명 그대로 사용
+        self.name = model if dimensions is None else f"{model}|dimensions={dimensions}"
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        from app.utils.gpt_client import _with_retries, get_client
+        from app.utils.metrics import record_usage
+
+        client = get_client()
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+
+        async def _call():
+            resp = await client.embeddings.create(input=texts, model=self.model, **kwargs)
+            record_usage(self.model, resp.usage)
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+        return await _with_retries(_call)
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers 모델을 로컬 경로에서 읽어 CPU로 임베딩합니다.
+    encode는 CPU를 오래 점유하므로 전용 스레드 풀에서 실행해 이벤트 루프를 막지 않습니다.
+    """
+
+    def __init__(self, model_path: str, backend: str = "torch", batch_size: int = 32, threads: int = 1):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_PROVIDER=local 에는 sentence-transformers 패키지가 필요합니다.") from e
+
+        kwargs = {"backend": backend} if backend != "torch" else {}
+        self.model = SentenceTransformer(model_path, device="cpu", **kwargs)
+        self.batch_size = batch_size
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.name = f"local:{model_path}"
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="embed")
+        logger.info(f"로컬 임베딩 모델 로드: {model_path} (backend={backend}, dim={self.dim})")
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32).tolist()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    단어와 문자 2/3-gram을 부호 있는 해시로 dim 차원에 누적한 뒤 L2 정규화합니다.
+    모델/네트워크 없이 항상 같은 결과를 내므로 테스트와 부하 측정용으로 사용합니다.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        text = " ".join(unicodedata.normalize("NFC", text).lower().split())
+        padded = f" {text} "
+        feats = [f"w:{w}" for w in text.split()]
+        for n in (2, 3):
+            feats.extend(f"c{n}:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return feats
+
+    def embed_one(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += -1.0 if h >> 63 else 1.0
+        norm = float(np.linalg.norm(vec))
+        return (vec / norm if norm > 0 else vec).tolist()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(t) for t in texts]
+
+
+# -----------------------------
+# 설정 기반 전역 provider
+# -----------------------------
+_provider: Optional[EmbeddingProvider] = None
+
+
+def create_embedding_provider() -> EmbeddingProvider:
+    from app.config.Settings import settings
+    from app.utils.gpt_client import EMBEDDING_MODEL
+
+    kind = settings.EMBEDDING_PROVIDER
+    if kind == "openai":
+        return OpenAIEmbeddingProvider(EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS)
+    if kind == "local":
+        return LocalEmbeddingProvider(
+            settings.LOCAL_EMBEDDING_MODEL_PATH,
+            backend=settings.LOCAL_EMBEDDING_BACKEND,
+            batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            threads=settings.LOCAL_EMBEDDING_THREADS,
+        )
+    if kind == "hashing":
+        return HashingEmbeddingProvider(settings.HASHING_EMBEDDING_DIM)
+    raise ValueError(f"알 수 없는 EMBEDDING_PROVIDER: {kind}")
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """설정(EMBEDDING_PROVIDER)에 따른 프로세스 전역 provider를 반환합니다. (최초 호출 시 생성)"""
+    global _provider
+    if _provider is None:
+        _provider = create_embedding_provider()
+    return _provider
+
+
+async def aclose_embedding_provider() -> None:
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
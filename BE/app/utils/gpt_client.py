@@ -1,8 +1,15 @@
 # utils/gpt_client.py
 import os
 import asyncio
-from typing import List, Dict, Any, Callable, TypeVar, Awaitable
+from typing import List, Dict, Any, AsyncIterator, Callable, TypeVar, Awaitable, Optional, Tuple
+
+import httpx
 from openai import AsyncOpenAI
+from app.utils.embedding_batcher import EmbeddingBatcher
+from app.utils.embedding_cache import EmbeddingCache, normalize_text
+from app.utils.embedding_provider import EmbeddingProvider, aclose_embedding_provider, get_embedding_provider
+from app.utils.metrics import OPENAI_RETRIES, record_usage
+from app.utils.single_flight import SingleFlight
 from openai import (
     OpenAIError,
     APIError,
@@ -10,7 +17,7 @@ from openai import (
     RateLimitError,
 )
 
-# Timeout은 httpx.Timeout을 그대로 쓰기보다는 client 생성 옵션으로 처리
+# Timeout/연결 풀은 공유 httpx.AsyncClient 생성 옵션으로 처리 (Settings의 OPENAI_* 값)
 
 # -----------------------------
 # 환경 변수 / 상수
@@ -22,9 +29,112 @@ DEFAULT_MAX_TOKENS = int(os.getenv("DEFAULT_MAX_TOKENS", "256"))
 INITIAL_BACKOFF = float(os.getenv("OPENAI_BACKOFF_INITIAL", "0.5"))
 BACKOFF_FACTOR = float(os.getenv("OPENAI_BACKOFF_FACTOR", "2.0"))
 
-def get_client(api_key: str = None) -> AsyncOpenAI:
-    """AsyncOpenAI 클라이언트를 반환합니다."""
-    return AsyncOpenAI(api_key=api_key)
+# -----------------------------
+# 공유 클라이언트 레지스트리
+# -----------------------------
+# 모든 AsyncOpenAI 인스턴스가 하나의 httpx.AsyncClient(keep-alive, HTTP/2)를 공유하고,
+# (api_key, base_url) 조합별로 AsyncOpenAI를 한 번만 만들어 재사용합니다.
+_http_client: Optional[httpx.AsyncClient] = None
+_clients: Dict[Tuple[Optional[str], Optional[str]], AsyncOpenAI] = {}
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """프로세스 전역 httpx.AsyncClient를 반환합니다. (최초 호출 시 생성)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        from app.config.Settings import settings
+        _http_client = httpx.AsyncClient(
+            http2=settings.OPENAI_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.OPENAI_CONNECT_TIMEOUT,
+                read=settings.OPENAI_READ_TIMEOUT,
+                write=settings.OPENAI_WRITE_TIMEOUT,
+                pool=settings.OPENAI_POOL_TIMEOUT,
+            ),
+        )
+    return _http_client
+
+
+def get_client(api_key: str = None, base_url: str = None) -> AsyncOpenAI:
+    """(api_key, base_url)별로 공유되는 AsyncOpenAI 클라이언트를 반환합니다."""
+    from app.config.Settings import settings
+    api_key = api_key or settings.OPENAI_API_KEY
+    base_url = base_url or settings.OPENAI_BASE_URL
+
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is None or _http_client is None or _http_client.is_closed:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=_get_http_client(),
+        )
+        _clients[key] = client
+    return client
+
+
+async def aclose_clients() -> None:
+    """임베딩 배처·provider, 공유 클라이언트, 임베딩 캐시를 모두 닫습니다. (앱 종료 시 lifespan에서 호출)"""
+    global _http_client, _embedding_cache
+    batchers = list(_embedding_batchers.values())
+    _embedding_batchers.clear()
+    for batcher in batchers:
+        await batcher.aclose()
+    await aclose_embedding_provider()
+    _clients.clear()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _embedding_cache is not None:
+        _embedding_cache.close()
+        _embedding_cache = None
+
+
+# -----------------------------
+# 임베딩 캐시 / 동시 호출 합치기
+# -----------------------------
+_embedding_cache: Optional[EmbeddingCache] = None
+# 같은 (provider, 텍스트)의 임베딩 요청이 동시에 들어오면 임베딩 호출 1회를 공유
+_embedding_flight: SingleFlight[List[float]] = SingleFlight()
+# 서로 다른 텍스트라도 짧은 시간 안에 들어온 요청은 provider별로 묶어서 전송
+_embedding_batchers: Dict[str, EmbeddingBatcher] = {}
+
+
+def _get_embedding_batcher(provider: EmbeddingProvider) -> Optional[EmbeddingBatcher]:
+    """설정에 따라 임베딩 provider별 배처를 반환합니다. (비활성화 시 None)"""
+    from app.config.Settings import settings
+    if not settings.EMBEDDING_BATCH_ENABLED:
+        return None
+
+    batcher = _embedding_batchers.get(provider.name)
+    if batcher is None:
+        batcher = EmbeddingBatcher(
+            provider.embed,
+            window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        )
+        _embedding_batchers[provider.name] = batcher
+    return batcher
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """설정에 따라 프로세스 전역 임베딩 캐시를 반환합니다. (비활성화 시 None)"""
+    global _embedding_cache
+    from app.config.Settings import settings
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+            sqlite_path=settings.EMBEDDING_CACHE_SQLITE_PATH,
+        )
+    return _embedding_cache
 
 T = TypeVar("T")
 
@@ -47,6 +157,7 @@ async def _with_retries(
         except (RateLimitError, APIConnectionError, APIError) as e:
             if attempt == max_retries:
                 raise
+            OPENAI_RETRIES.labels(type(e).__name__).inc()
             # 필요하면 로거로 교체
             print(f"[OpenAI Retry {attempt}/{max_retries}] {type(e).__name__}: {e}")
             await asyncio.sleep(delay)
@@ -83,34 +194,83 @@ async def chat_completion(
             messages=messages,
             **kwargs,
         )
+        record_usage(model, resp.usage)
         return resp.choices[0].message.content or ""
 
     content = await _with_retries(_call)
     return content.strip()
 
+
+async def chat_completion_stream(
+    messages: List[Dict[str, str]],
+    model: str = GPT_MODEL,
+    api_key: str = None,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """
+    비동기 GPT 스트리밍 호출 래퍼 (stream=True)
+    - 생성되는 텍스트 조각(delta)을 도착하는 즉시 yield 합니다.
+    - 재시도는 스트림 연결 수립 단계에만 적용합니다. (이미 전달한 토큰은 되돌릴 수 없음)
+    - 토큰 사용량은 stream_options.include_usage로 받은 마지막 청크에서 기록합니다.
+    """
+    if "max_tokens" not in kwargs:
+        kwargs["max_tokens"] = DEFAULT_MAX_TOKENS
+    kwargs.setdefault("stream_options", {"include_usage": True})
+
+    _client = get_client(api_key=api_key)
+
+    async def _open():
+        return await _client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **kwargs,
+        )
+
+    stream = await _with_retries(_open)
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                # include_usage 사용 시 choices가 빈 마지막 청크에 usage가 담겨 옴
+                record_usage(model, getattr(chunk, "usage", None))
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        await stream.close()
+
 # -----------------------------
 # Embeddings (v1.x)
 # -----------------------------
 async def get_embedding(
     text: str,
-    model: str = EMBEDDING_MODEL,
-    api_key: str = None,
-    **kwargs: Any,
+    provider: Optional[EmbeddingProvider] = None,
 ) -> List[float]:
     """
-    비동기 OpenAI 임베딩 호출 (v1.x)
+    비동기 임베딩 호출
     - text: 임베딩할 텍스트
-    - model: text-embedding-3-small / text-embedding-3-large 등
-    - api_key: OpenAI API 키
+    - provider: 생략하면 설정(EMBEDDING_PROVIDER)의 전역 provider (openai / local / hashing)
+    - 동일한 (provider, 정규화 텍스트)는 캐시에서 반환하고, 진행 중인 동일 요청이 있으면 합류합니다.
+    - 캐시 미스는 micro-batcher를 통해 다른 요청과 함께 배치로 전송됩니다.
     """
-    _client = get_client(api_key=api_key)
-    
-    async def _call():
-        resp = await _client.embeddings.create(
-            input=text,
-            model=model,
-            **kwargs,
-        )
-        return resp.data[0].embedding
+    text = normalize_text(text)
+    provider = provider or get_embedding_provider()
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = await cache.get(provider.name, text)
+        if cached is not None:
+            return cached.tolist()
+
+    batcher = _get_embedding_batcher(provider)
+
+    async def _fetch() -> List[float]:
+        if batcher is not None:
+            embedding = await batcher.submit(text)
+        else:
+            embedding = (await provider.embed([text]))[0]
+        if cache is not None:
+            await cache.set(provider.name, text, embedding)
+        return embedding
 
-    return await _with_retries(_call)
+    return await _embedding_flight.do((provider.name, text), _fetch)
@@ -0,0 +1,137 @@
+# utils/history_buffer.py
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class HistoryItem:
+    chat_id: str
+    timestamp: datetime
+    request: str
+    response: str
+
+    @property
+    def size(self) -> int:
+        return len(self.request) + len(self.response)
+
+
+class RecentHistoryBuffer:
+    """
+    사용자별 최근 (질문, 답변) 링 버퍼
+    - 사용자당 최근 per_user개만 최신순으로 보관
+    - 전체 사용자 수(max_users)와 보관 문자 수(max_chars)를 넘으면 가장 오래 사용하지 않은 사용자부터 축출
+    - 버퍼가 없는 사용자는 begin_fill() → (DB 조회) → fill()로 채우고, 그 뒤로는 append()로 쓰기를 반영합니다.
+      begin_fill() 이후 fill() 전에 들어온 append()는 따로 모아 두었다가 fill()에서 병합합니다.
+    """
+
+    def __init__(self, per_user: int = 5, max_users: int = 10000, max_chars: int = 20_000_000):
+        self.per_user = per_user
+        self.max_users = max_users
+        self.max_chars = max_chars
+        self._users: "OrderedDict[str, List[HistoryItem]]" = OrderedDict()
+        self._chars = 0
+        # 채우는 중인 사용자 → (진행 중인 조회 수, 그동안 append된 항목)
+        self._filling: Dict[str, Tuple[int, List[HistoryItem]]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[List[HistoryItem]]:
+        """버퍼된 최근 대화(최신순)를 반환합니다. 버퍼가 없으면 None"""
+        items = self._users.get(user_id)
+        if items is None:
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return list(items)
+
+    def begin_fill(self, user_id: str) -> None:
+        """DB 조회 전에 호출합니다. 이후 fill()/abort_fill() 전까지의 append()를 기록합니다."""
+        count, appended = self._filling.get(user_id, (0, []))
+        self._filling[user_id] = (count + 1, appended)
+
+    def fill(self, user_id: str, items: Iterable[HistoryItem]) -> List[HistoryItem]:
+        """
+        DB 조회 결과 등으로 사용자 버퍼를 채웁니다.
+        조회 중에 append된 항목이 있을 수 있으므로 덮어쓰지 않고 id 기준으로 병합합니다.
+        """
+        merged: Dict[str, HistoryItem] = {i.chat_id: i for i in self._users.get(user_id, [])}
+        for item in list(items) + self._end_fill(user_id):
+            merged.setdefault(item.chat_id, item)
+        self._set(user_id, list(merged.values()))
+        return list(self._users[user_id])
+
+    def abort_fill(self, user_id: str) -> None:
+        """DB 조회가 실패했을 때 begin_fill()을 정리합니다."""
+        self._end_fill(user_id)
+
+    def append(self, user_id: str, item: HistoryItem) -> None:
+        """
+        새로 저장한 대화를 반영합니다.
+        버퍼가 없는 사용자는 다음 조회 때 DB에서 채우므로 무시하되, 채우는 중이면 fill()에서 병합하도록 기록합니다.
+        """
+        items = self._users.get(user_id)
+        if items is None:
+            if user_id in self._filling:
+                self._filling[user_id][1].append(item)
+            return
+        self._set(user_id, items + [item])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "chars": self._chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    # ---------------------------
+    # 내부 구현
+    # ---------------------------
+    def _end_fill(self, user_id: str) -> List[HistoryItem]:
+        """진행 중인 조회 하나를 끝내고 그동안 append된 항목을 반환 (다른 조회가 남아 있으면 기록 유지)"""
+        state = self._filling.get(user_id)
+        if state is None:
+            return []
+        count, appended = state
+        if count <= 1:
+            del self._filling[user_id]
+        else:
+            self._filling[user_id] = (count - 1, appended)
+        return list(appended)
+
+    def _set(self, user_id: str, items: List[HistoryItem]) -> None:
+        items = sorted(items, key=lambda i: (i.timestamp, i.chat_id), reverse=True)[: self.per_user]
+        old = self._users.pop(user_id, [])
+        self._chars -= sum(i.size for i in old)
+        self._users[user_id] = items
+        self._chars += sum(i.size for i in items)
+        self._evict(keep=user_id)
+
+    def _evict(self, keep: str) -> None:
+        while len(self._users) > 1 and (len(self._users) > self.max_users or self._chars > self.max_chars):
+            user_id, items = next(iter(self._users.items()))
+            if user_id == keep:
+                self._users.move_to_end(user_id)
+                continue
+            del self._users[user_id]
+            self._chars -= sum(i.size for i in items)
+            self.evictions += 1
+
+    @staticmethod
+    def to_prompt_lines(items: Iterable[HistoryItem]) -> List[str]:
+        return [f"Q: {i.request}\nA: {i.response}" for i in items]
+
+
+def history_item_from_row(row) -> HistoryItem:
+    """Chat ORM 객체 또는 write-behind 행(dict)을 HistoryItem으로 변환"""
+    if isinstance(row, dict):
+        return HistoryItem(row["id"], row["timestamp"], row["request"], row["response"])
+    return HistoryItem(row.id, row.timestamp, row.request, row.response)
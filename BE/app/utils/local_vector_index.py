@@ -0,0 +1,251 @@
+# utils/local_vector_index.py
+from __future__ import annotations
+
+import asyncio
+import json
+import mmap
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config.logging_config import logger
+
+VECTORS_FILE = "vectors.f32"     # 정규화된 float32 벡터 (row-major, count x dim)
+PAYLOADS_FILE = "payloads.jsonl"  # 줄마다 {"id": ..., "payload": {...}}
+META_FILE = "meta.json"           # {"dim": ..., "count": ..., "model": ...}
+
+
+@dataclass
+class LocalScoredPoint:
+    """qdrant_client의 ScoredPoint와 같은 속성을 가진 검색 결과"""
+    id: Any
+    score: float
+    payload: Dict[str, Any]
+    vector: Optional[List[float]] = None
+
+
+class LocalVectorIndex:
+    """
+    프로세스 메모리 안에서 동작하는 벡터 검색 인덱스 (소규모 코퍼스용 Qdrant 대안)
+    - kakao_preprocess.py --local-index-dir 로 만든 파일을 memory-map으로 읽습니다.
+    - 기본은 NumPy 행렬곱 기반 정확한 코사인 top-k, nlist > 0이면 IVF(k-means 분할) 근사 검색
+    - QdrantClientAsync.search와 같은 인터페이스를 제공하므로 RAGService에서 그대로 교체해 쓸 수 있습니다.
+    - query_filter는 must 조건의 match(값 일치)/range(수치·시각 범위)만 지원하며,
+      필터에 쓰인 payload 필드는 처음 사용할 때 한 번 읽어 열(column) 배열로 캐시합니다.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        payload_file: Path,
+        nlist: int = 0,
+        nprobe: int = 8,
+    ):
+        self.vectors = vectors
+        self.nprobe = nprobe
+
+        # payload는 필요한 줄만 읽도록 줄 시작 위치만 메모리에 유지
+        self._payload_fp = open(payload_file, "rb")
+        self._payload_map = mmap.mmap(self._payload_fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = self._line_offsets(self._payload_map)
+        if len(self._offsets) != len(vectors):
+            raise ValueError(f"벡터 수({len(vectors)})와 payload 수({len(self._offsets)})가 다릅니다.")
+
+        self._columns: Dict[str, np.ndarray] = {}  # 필터용 payload 필드 열
+
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        if nlist > 0 and len(vectors) > nlist:
+            self._build_ivf(nlist)
+
+    @classmethod
+    def load(cls, path: str | Path, nlist: int = 0, nprobe: int = 8) -> "LocalVectorIndex":
+        base = Path(path)
+        meta = json.loads((base / META_FILE).read_text(encoding="utf-8"))
+        vectors = np.memmap(
+            base / VECTORS_FILE,
+            dtype=np.float32,
+            mode="r",
+            shape=(int(meta["count"]), int(meta["dim"])),
+        )
+        index = cls(vectors, base / PAYLOADS_FILE, nlist=nlist, nprobe=nprobe)
+        logger.info(
+            f"로컬 벡터 인덱스 로드: {base} (count={meta['count']}, dim={meta['dim']}, "
+            f"ivf={'off' if index.centroids is None else len(index.lists)})"
+        )
+        return index
+
+    async def aclose(self) -> None:
+        self._payload_map.close()
+        self._payload_fp.close()
+
+    # ---------------------------
+    # 검색 (QdrantClientAsync.search 호환)
+    # ---------------------------
+    async def search(
+        self,
+        query_vector: List[float],
+        limit: int = 6,
+        score_threshold: Optional[float] = None,
+        with_vectors: bool = False,
+        exact: bool = False,
+        query_filter: Any = None,
+        **_: Any,
+    ) -> List[LocalScoredPoint]:
+        """벡터 유사도 검색 (CPU 연산은 스레드에서 실행해 이벤트 루프를 막지 않음)"""
+        return await asyncio.to_thread(
+            self.search_sync, query_vector, limit, score_threshold, with_vectors, exact, query_filter
+        )
+
+    def search_sync(
+        self,
+        query_vector: List[float],
+        limit: int = 6,
+        score_threshold: Optional[float] = None,
+        with_vectors: bool = False,
+        exact: bool = False,
+        query_filter: Any = None,
+    ) -> List[LocalScoredPoint]:
+        q = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        if norm > 0:
+            q = q / norm
+
+        mask = self._filter_mask(query_filter) if query_filter is not None else None
+        if mask is not None:
+            # 필터를 통과한 행만 정확 검색 (선택도가 높은 필터에서 IVF 탐색 누락 방지)
+            candidates = np.flatnonzero(mask)
+            scores = self.vectors[candidates] @ q
+        elif self.centroids is None or exact:
+            candidates = None
+            scores = self.vectors @ q
+        else:
+            probe = np.argsort(self.centroids @ q)[::-1][: self.nprobe]
+            candidates = np.concatenate([self.lists[c] for c in probe])
+            scores = self.vectors[candidates] @ q
+
+        k = min(limit, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results: List[LocalScoredPoint] = []
+        for i in top:
+            score = float(scores[i])
+            if score_threshold is not None and score < score_threshold:
+                break
+            row = int(candidates[i]) if candidates is not None else int(i)
+            record = self._payload(row)
+            results.append(
+                LocalScoredPoint(
+                    id=record.get("id", row),
+                    score=score,
+                    payload=record.get("payload", {}),
+                    vector=self.vectors[row].tolist() if with_vectors else None,
+                )
+            )
+        return results
+
+    # ---------------------------
+    # 내부 구현
+    # ---------------------------
+    @staticmethod
+    def _line_offsets(buf: mmap.mmap) -> np.ndarray:
+        offsets = [0]
+        pos = buf.find(b"\n")
+        while pos != -1:
+            if pos + 1 < len(buf):
+                offsets.append(pos + 1)
+            pos = buf.find(b"\n", pos + 1)
+        if len(buf) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(offsets, dtype=np.int64)
+
+    def _payload(self, row: int) -> Dict[str, Any]:
+        start = int(self._offsets[row])
+        end = self._payload_map.find(b"\n", start)
+        line = self._payload_map[start:] if end == -1 else self._payload_map[start:end]
+        return json.loads(line)
+
+    def _filter_mask(self, query_filter: Any) -> np.ndarray:
+        """qdrant Filter(must: FieldCondition[match|range])를 행 단위 boolean 마스크로 변환"""
+        if getattr(query_filter, "should", None) or getattr(query_filter, "must_not", None):
+            raise ValueError("로컬 인덱스는 must 조건만 지원합니다.")
+        mask = np.ones(len(self.vectors), dtype=bool)
+        for cond in getattr(query_filter, "must", None) or []:
+            match, rng = getattr(cond, "match", None), getattr(cond, "range", None)
+            if match is not None and hasattr(match, "value"):
+                mask &= self._column(cond.key) == match.value
+            elif rng is not None:
+                col = self._column(cond.key, numeric=True)
+                with np.errstate(invalid="ignore"):
+                    for op, bound in (("gte", np.greater_equal), ("gt", np.greater),
+                                      ("lte", np.less_equal), ("lt", np.less)):
+                        value = getattr(rng, op, None)
+                        if value is not None:
+                            mask &= bound(col, self._to_number(value))
+            else:
+                raise ValueError(f"로컬 인덱스에서 지원하지 않는 필터 조건: {cond!r}")
+        return mask
+
+    def _column(self, key: str, numeric: bool = False) -> np.ndarray:
+        """payload 필드 하나를 전체 행에 대해 읽어 캐시 (숫자/시각은 float, 없으면 NaN)"""
+        cache_key = f"{key}#num" if numeric else key
+        col = self._columns.get(cache_key)
+        if col is None:
+            values = [self._payload(row).get("payload", {}).get(key) for row in range(len(self._offsets))]
+            if numeric:
+                col = np.asarray([self._to_number(v) for v in values], dtype=np.float64)
+            else:
+                col = np.empty(len(values), dtype=object)
+                col[:] = values
+            self._columns[cache_key] = col
+        return col
+
+    @staticmethod
+    def _to_number(value: Any) -> float:
+        """수치는 그대로, 시각(datetime/ISO 문자열)은 epoch 초로 변환 (시간대가 없으면 UTC, Qdrant와 동일)"""
+        if value is None:
+            return float("nan")
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return float("nan")
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value.timestamp()
+        return float(value)
+
+    def _build_ivf(self, nlist: int, iterations: int = 10, sample_size: int = 50_000) -> None:
+        """표본에 구면 k-means를 돌려 중심을 구하고, 전체 벡터를 가장 가까운 중심의 목록에 배정"""
+        rng = np.random.default_rng(0)
+        n = len(self.vectors)
+        sample = np.asarray(self.vectors[rng.choice(n, size=min(n, sample_size), replace=False)])
+        if nlist > len(sample):
+            # 중심은 표본에서 서로 다른 행으로 고르므로 표본 크기보다 많을 수 없음
+            logger.warning(f"IVF 목록 수({nlist})가 표본 크기({len(sample)})보다 커서 {len(sample)}개로 줄입니다.")
+            nlist = len(sample)
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+
+        # 전체 배정은 메모리를 아끼기 위해 나눠서 계산
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 65536):
+            chunk = np.asarray(self.vectors[start:start + 65536])
+            assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assign == c) for c in range(nlist)]
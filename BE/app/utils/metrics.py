@@ -0,0 +1,135 @@
+# utils/metrics.py
+from typing import Any, Iterator, Optional
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from app.utils.stage_timer import StageTimer
+
+# 대부분 수 ms~수 s 구간 (임베딩/검색은 ms, LLM은 s 단위)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ─── 1. 요청 / 단계별 지연 시간 ───
+HTTP_REQUEST_SECONDS = Histogram(
+    "mychat_http_request_seconds",
+    "HTTP 요청 처리 시간 (스트리밍은 응답 헤더 전송까지)",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "mychat_chat_stage_seconds",
+    "채팅 파이프라인 단계별 소요 시간 (history, embedding, search, mmr, prompt, llm, db_write)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# ─── 2. OpenAI 호출 ───
+OPENAI_RETRIES = Counter(
+    "mychat_openai_retries_total",
+    "OpenAI 호출 재시도 횟수 (오류 종류별)",
+    ["error"],
+)
+OPENAI_TOKENS = Counter(
+    "mychat_openai_tokens_total",
+    "OpenAI 응답 usage 기준 토큰 사용량",
+    ["model", "kind"],
+)
+
+
+# ─── 2-1. 채팅 기록 write-behind 저장 ───
+CHAT_WRITE_FLUSH_SECONDS = Histogram(
+    "mychat_chat_write_flush_seconds",
+    "write-behind 큐의 일괄 INSERT 한 번에 걸린 시간 (재시도 포함)",
+    ["result"],
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_WRITE_ROWS = Counter(
+    "mychat_chat_write_rows_total",
+    "write-behind 큐가 처리한 채팅 행 수 (written: 저장, dropped: 저장 실패/종료 시 유실)",
+    ["result"],
+)
+
+
+def observe_stages(timer: StageTimer) -> None:
+    """요청 한 건의 StageTimer 기록을 단계별 히스토그램에 반영합니다."""
+    for name, seconds in timer.timings.items():
+        STAGE_SECONDS.labels(name).observe(seconds)
+
+
+def record_usage(model: str, usage: Any) -> None:
+    """completion/embedding 응답의 usage를 토큰 카운터에 더합니다. (usage가 없으면 무시)"""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            OPENAI_TOKENS.labels(model, kind.removesuffix("_tokens")).inc(value)
+
+
+# ─── 3. 캐시 / DB 연결 풀 (수집 시점에 현재 값을 읽음) ───
+class AppStateCollector(Collector):
+    """
+    /metrics 수집 시점에 캐시 적중 통계와 DB 연결 풀 상태를 읽어 내보냅니다.
+    요청 경로에서는 아무 일도 하지 않으므로 오버헤드가 없습니다.
+    """
+
+    def __init__(self, app: Any, engine: Any):
+        self.app = app
+        self.engine = engine
+
+    def collect(self) -> Iterator[Any]:
+        from app.utils.gpt_client import get_embedding_cache
+
+        hits = CounterMetricFamily("mychat_cache_hits", "캐시 적중 횟수", labels=["cache"])
+        misses = CounterMetricFamily("mychat_cache_misses", "캐시 미스 횟수", labels=["cache"])
+        ratio = GaugeMetricFamily("mychat_cache_hit_ratio", "프로세스 시작 이후 캐시 적중률", labels=["cache"])
+
+        caches = {}
+        embedding_cache = get_embedding_cache()
+        if embedding_cache is not None:
+            s = embedding_cache.stats()
+            caches["embedding"] = (s["hits"] + s["disk_hits"], s["misses"])
+        semantic_cache = getattr(self.app.state, "semantic_cache", None)
+        if semantic_cache is not None:
+            caches["semantic"] = (semantic_cache.stats.hits, semantic_cache.stats.misses)
+        history_buffer = getattr(self.app.state, "history_buffer", None)
+        if history_buffer is not None:
+            caches["history_buffer"] = (history_buffer.hits, history_buffer.misses)
+
+        for name, (h, m) in caches.items():
+            hits.add_metric([name], h)
+            misses.add_metric([name], m)
+            ratio.add_metric([name], h / (h + m) if h + m else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+
+        pool = self.engine.pool
+        for name, doc, fn in (
+            ("mychat_db_pool_size", "DB 연결 풀 크기", "size"),
+            ("mychat_db_pool_checked_out", "사용 중인 DB 연결 수", "checkedout"),
+            ("mychat_db_pool_checked_in", "유휴 DB 연결 수", "checkedin"),
+            ("mychat_db_pool_overflow", "pool_size를 넘어 추가로 연 연결 수", "overflow"),
+        ):
+            if hasattr(pool, fn):
+                yield GaugeMetricFamily(name, doc, value=getattr(pool, fn)())
+
+        write_queue = getattr(self.app.state, "chat_write_queue", None)
+        if write_queue is not None:
+            yield GaugeMetricFamily(
+                "mychat_chat_write_queue_depth", "저장 대기 중인 채팅 행 수",
+                value=write_queue.stats()["queue_depth"],
+            )
+
+
+_collector: Optional[AppStateCollector] = None
+
+
+def register_app_collector(app: Any, engine: Any) -> None:
+    """앱 상태 수집기를 기본 레지스트리에 한 번만 등록합니다. (lifespan 시작 시 호출)"""
+    global _collector
+    if _collector is not None:
+        REGISTRY.unregister(_collector)
+    _collector = AppStateCollector(app, engine)
+    REGISTRY.register(_collector)
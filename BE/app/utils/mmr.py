@@ -0,0 +1,46 @@
+# utils/mmr.py
+from typing import List, Sequence
+
+import numpy as np
+
+
+def mmr_select(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Maximal Marginal Relevance로 후보 중 k개를 고릅니다. (선택 순서대로 후보 인덱스 반환)
+    - 점수 = λ·sim(질문, 후보) − (1−λ)·max sim(후보, 이미 고른 항목)
+    - λ=1이면 유사도 순 그대로, 0에 가까울수록 서로 다른 항목을 우선
+    - 후보 간 유사도 행렬을 한 번에 계산하고, 고른 항목과의 최대 유사도는 누적 갱신하므로
+      반복마다 O(n) 연산만 수행합니다.
+    """
+    cands = np.asarray(candidate_vectors, dtype=np.float32)
+    if cands.ndim != 2 or len(cands) == 0 or k <= 0:
+        return []
+    cands = cands / np.maximum(np.linalg.norm(cands, axis=1, keepdims=True), 1e-12)
+    q = np.asarray(query_vector, dtype=np.float32)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+    relevance = cands @ q
+    k = min(k, len(cands))
+    if lambda_mult >= 1.0 or k == len(cands):
+        return np.argsort(-relevance)[:k].tolist()
+
+    pairwise = cands @ cands.T
+    first = int(np.argmax(relevance))
+    selected = [first]
+    chosen = np.zeros(len(cands), dtype=bool)
+    chosen[first] = True
+    max_sim = pairwise[first].copy()
+
+    for _ in range(k - 1):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        chosen[best] = True
+        np.maximum(max_sim, pairwise[best], out=max_sim)
+    return selected
@@ -0,0 +1,177 @@
+# utils/semantic_cache.py
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 유사도 분포 집계 구간 (임계치 튜닝용: 각 구간 이상의 최고 점수를 받은 조회 수)
+SCORE_BUCKETS = (0.80, 0.85, 0.90, 0.93, 0.95, 0.97, 0.99)
+
+
+@dataclass
+class _Entry:
+    entry_id: int
+    scope: str
+    question: str
+    answer: str
+    vector: np.ndarray  # 정규화된 float32 벡터
+    created_at: float
+    hits: int = 0
+
+
+@dataclass
+class SemanticCacheStats:
+    lookups: int = 0
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    score_buckets: Dict[float, int] = field(default_factory=lambda: {b: 0 for b in SCORE_BUCKETS})
+
+
+class SemanticCache:
+    """
+    질문 임베딩 기반 답변 캐시
+    - scope(사용자 ID 또는 전역)별로 저장된 질문 벡터와의 코사인 유사도가 임계치 이상이면 답변을 재사용합니다.
+    - 전체 항목 수 기준 LRU 축출, 생성 후 max_age가 지난 항목은 만료됩니다.
+    """
+
+    GLOBAL_SCOPE = "__global__"
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 2000,
+        max_age_seconds: float = 3600.0,
+        per_user: bool = True,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.per_user = per_user
+        self.stats = SemanticCacheStats()
+
+        self._ids = itertools.count()
+        self._lru: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._scopes: Dict[str, Dict[int, _Entry]] = {}
+        # scope별 (벡터 행렬, entry_id 목록) - 항목이 바뀔 때만 다시 만듦
+        self._matrices: Dict[str, Tuple[np.ndarray, List[int]]] = {}
+
+    def scope_for(self, user_id: str) -> str:
+        return user_id if self.per_user else self.GLOBAL_SCOPE
+
+    # ---------------------------
+    # 조회 / 저장
+    # ---------------------------
+    def lookup(self, user_id: str, query_vector: Sequence[float]) -> Optional[Tuple[str, float]]:
+        """유사한 질문의 캐시된 답변과 유사도를 반환합니다. 없으면 None"""
+        scope = self.scope_for(user_id)
+        self.stats.lookups += 1
+        self._expire(scope)
+
+        matrix_ids = self._matrix(scope)
+        if matrix_ids is None:
+            self.stats.misses += 1
+            return None
+
+        matrix, ids = matrix_ids
+        scores = matrix @ self._normalize(query_vector)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        for bucket in SCORE_BUCKETS:
+            if score >= bucket:
+                self.stats.score_buckets[bucket] += 1
+
+        if score < self.threshold:
+            self.stats.misses += 1
+            return None
+
+        entry = self._lru[ids[best]]
+        entry.hits += 1
+        self._lru.move_to_end(entry.entry_id)
+        self.stats.hits += 1
+        return entry.answer, score
+
+    def store(self, user_id: str, question: str, query_vector: Sequence[float], answer: str) -> None:
+        scope = self.scope_for(user_id)
+        entry = _Entry(
+            entry_id=next(self._ids),
+            scope=scope,
+            question=question,
+            answer=answer,
+            vector=self._normalize(query_vector),
+            created_at=time.monotonic(),
+        )
+        self._lru[entry.entry_id] = entry
+        self._scopes.setdefault(scope, {})[entry.entry_id] = entry
+        self._matrices.pop(scope, None)
+        self.stats.stores += 1
+
+        while len(self._lru) > self.max_entries:
+            _, oldest = self._lru.popitem(last=False)
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """메트릭/로그용 현재 상태"""
+        s = self.stats
+        return {
+            "entries": len(self._lru),
+            "lookups": s.lookups,
+            "hits": s.hits,
+            "misses": s.misses,
+            "hit_ratio": s.hits / s.lookups if s.lookups else 0.0,
+            "stores": s.stores,
+            "evictions": s.evictions,
+            "expirations": s.expirations,
+            "best_score_at_least": {str(k): v for k, v in s.score_buckets.items()},
+        }
+
+    def top_entries(self, n: int = 10) -> List[Dict[str, object]]:
+        """
+        적중 횟수가 많은 항목의 적중 수/경과 시간 (임계치 점검용)
+        사용자 ID(scope)와 질문 원문은 외부로 내보내지 않습니다.
+        """
+        now = time.monotonic()
+        entries = sorted(self._lru.values(), key=lambda e: e.hits, reverse=True)[:n]
+        return [{"hits": e.hits, "age_seconds": round(now - e.created_at, 1)} for e in entries]
+
+    # ---------------------------
+    # 내부 구현
+    # ---------------------------
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm > 0 else arr
+
+    def _matrix(self, scope: str) -> Optional[Tuple[np.ndarray, List[int]]]:
+        entries = self._scopes.get(scope)
+        if not entries:
+            return None
+        cached = self._matrices.get(scope)
+        if cached is None:
+            ids = list(entries.keys())
+            cached = (np.stack([entries[i].vector for i in ids]), ids)
+            self._matrices[scope] = cached
+        return cached
+
+    def _expire(self, scope: str) -> None:
+        deadline = time.monotonic() - self.max_age_seconds
+        expired = [e for e in self._scopes.get(scope, {}).values() if e.created_at < deadline]
+        for entry in expired:
+            del self._lru[entry.entry_id]
+            self._remove(entry)
+            self.stats.expirations += 1
+
+    def _remove(self, entry: _Entry) -> None:
+        bucket = self._scopes.get(entry.scope)
+        if bucket is not None:
+            bucket.pop(entry.entry_id, None)
+            if not bucket:
+                del self._scopes[entry.scope]
+        self._matrices.pop(entry.scope, None)
@@ -0,0 +1,42 @@
+# utils/single_flight.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    같은 키로 동시에 들어온 비동기 작업을 하나로 합칩니다.
+    - 첫 호출이 작업을 시작하고, 진행 중에 들어온 동일 키 호출은 그 결과를 함께 기다립니다.
+    - 작업은 별도 Task로 실행되므로 한 호출자가 취소되어도 나머지 호출자는 결과를 받습니다.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Task[T]"] = {}
+        self.started = 0   # 실제로 실행된 작업 수
+        self.coalesced = 0  # 진행 중 작업에 합류한 호출 수
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Task[T]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 모든 호출자가 취소된 경우에도 "예외 미확인" 경고가 남지 않도록 처리
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,27 @@
+# utils/stage_timer.py
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """
+    요청 한 건의 단계별 소요 시간을 기록합니다.
+    - time.perf_counter 기반 (단조 증가 시계)
+    - 동시에 실행되는 단계도 이름만 다르면 함께 기록할 수 있습니다.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def summary(self) -> str:
+        """로그용 요약 문자열 (예: 'history=3.1ms, embedding=120.4ms')"""
+        return ", ".join(f"{name}={sec * 1000:.1f}ms" for name, sec in self.timings.items())
@@ -0,0 +1,39 @@
+# utils/token_counter.py
+from functools import lru_cache
+
+from app.config.logging_config import logger
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 미설치 환경에서는 근사치 사용
+    tiktoken = None
+
+FALLBACK_ENCODING = "o200k_base"  # gpt-4o 계열 토크나이저
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        # 인코딩 파일 다운로드 실패 등 → 근사치로 대체
+        logger.warning(f"토크나이저 로드 실패, 근사치로 계산합니다: {e}")
+        return None
+
+
+@lru_cache(maxsize=20000)
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    텍스트의 토큰 수를 반환합니다. (문자열별 결과 캐시)
+    tiktoken을 쓸 수 없으면 UTF-8 바이트 수 기반 근사치를 사용합니다. (한글 1글자 ≈ 1토큰)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text.encode("utf-8")) // 3 + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,6 @@
+"""
+MyChat 백엔드 성능 측정 스크립트 모음
+
+BE 디렉토리에서 모듈로 실행합니다.
+    python -m benchmarks.<스크립트 이름> --help
+"""
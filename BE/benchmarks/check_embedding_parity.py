@@ -0,0 +1,89 @@
+"""
+BE와 전처리기의 임베딩 provider가 같은 벡터 공간을 쓰는지 확인
+
+두 이미지는 빌드 컨텍스트가 달라 embedding_provider.py를 각각 가지고 있습니다.
+적재 벡터와 질문 벡터가 어긋나지 않도록 다음이 같은지 비교하고, 다르면 종료 코드 1을 반환합니다.
+- OpenAI 모델별 기본 차원 (OPENAI_EMBEDDING_DIMS)
+- provider name 형식 (캐시 키, 로컬 인덱스 meta.json의 model)
+- hashing provider의 벡터 값
+
+    python -m benchmarks.check_embedding_parity
+    python -m benchmarks.check_embedding_parity --preprocessing-dir ../Preprocessing
+"""
+import argparse
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from app.utils import embedding_provider as be
+
+SAMPLE_TEXTS = [
+    "",
+    "안녕",
+    "오늘 저녁 뭐 먹을래?",
+    "  여러   칸   공백\n과 줄바꿈\t탭  ",
+    "Hello, World! 123",
+    "ＡＢＣ 전각 문자와 조합형 한글",  # NFC 정규화 대상
+    "ㅋㅋㅋㅋㅋ 😂👍",
+    "아주 긴 문장 " * 50,
+]
+HASHING_DIMS = [64, 256, 1536]
+
+
+def get_args():
+    p = argparse.ArgumentParser("Embedding provider parity check (BE vs Preprocessing)")
+    p.add_argument("--preprocessing-dir", default=str(Path(__file__).resolve().parents[2] / "Preprocessing"))
+    return p.parse_args()
+
+
+def load_preprocessing_module(directory: str):
+    path = Path(directory) / "embedding_provider.py"
+    spec = importlib.util.spec_from_file_location("preprocessing_embedding_provider", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def compare(pre) -> list:
+    errors = []
+
+    if be.OPENAI_EMBEDDING_DIMS != pre.OPENAI_EMBEDDING_DIMS:
+        errors.append(f"OPENAI_EMBEDDING_DIMS 다름: BE={be.OPENAI_EMBEDDING_DIMS} / 전처리={pre.OPENAI_EMBEDDING_DIMS}")
+
+    for model in be.OPENAI_EMBEDDING_DIMS:
+        for dimensions in (None, 256):
+            a = be.OpenAIEmbeddingProvider(model, dimensions)
+            b = pre.OpenAIEmbeddingProvider(model, dimensions)
+            if (a.name, a.dim) != (b.name, b.dim):
+                errors.append(f"openai provider 다름 ({model}, {dimensions}): BE={a.name}/{a.dim} / 전처리={b.name}/{b.dim}")
+
+    for dim in HASHING_DIMS:
+        a = be.HashingEmbeddingProvider(dim)
+        b = pre.HashingEmbeddingProvider(dim)
+        if (a.name, a.dim) != (b.name, b.dim):
+            errors.append(f"hashing provider 다름 (dim={dim}): BE={a.name}/{a.dim} / 전처리={b.name}/{b.dim}")
+            continue
+        be_vectors = np.asarray(asyncio.run(a.embed(SAMPLE_TEXTS)), dtype=np.float32)
+        pre_vectors = b.embed(SAMPLE_TEXTS)
+        for text, x, y in zip(SAMPLE_TEXTS, be_vectors, pre_vectors):
+            if not np.allclose(x, y, atol=1e-6):
+                errors.append(f"hashing 벡터 다름 (dim={dim}, text={text[:20]!r}): 최대 차이 {np.abs(x - y).max():.2e}")
+    return errors
+
+
+def main():
+    args = get_args()
+    errors = compare(load_preprocessing_module(args.preprocessing_dir))
+    if errors:
+        print("❌ 임베딩 provider 불일치")
+        for e in errors:
+            print(f"  - {e}")
+        sys.exit(1)
+    print("✅ BE/전처리 임베딩 provider 일치 (dims, name 형식, hashing 벡터)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# benchmarks/common.py
+import json
+import math
+import statistics
+from typing import Any, Dict, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """정렬된 값에서 선형 보간 없이 nearest-rank 방식으로 백분위수를 구합니다."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: Sequence[float], elapsed: float | None = None) -> Dict[str, Any]:
+    """지연 시간(초) 목록을 ms 단위 요약 통계로 변환합니다."""
+    ms = [v * 1000.0 for v in latencies]
+    summary: Dict[str, Any] = {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+    if elapsed:
+        summary["elapsed_s"] = round(elapsed, 3)
+        summary["rps"] = round(len(ms) / elapsed, 2)
+    return summary
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """결과를 사람이 읽기 좋은 JSON으로 출력합니다."""
+    print(json.dumps(report, ensure_ascii=False, indent=2))
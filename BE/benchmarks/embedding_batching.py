@@ -0,0 +1,87 @@
+"""
+임베딩 micro-batching 효과 측정
+
+로컬 OpenAI 스텁 서버를 띄우고, 동시 임베딩 요청을 배치 창(window) 크기별로 보내
+처리량, 지연 시간, 실제 embeddings.create 호출 수를 비교합니다. (window 0 = 배칭 없음)
+
+    python -m benchmarks.embedding_batching -n 2000 -c 200 --windows 0 1 2 5 10 20
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from openai import AsyncOpenAI
+
+from app.utils.embedding_batcher import EmbeddingBatcher
+from benchmarks.common import print_report, summarize
+from benchmarks.stub_openai import StubConfig, start_stub_server, stop_stub_server
+
+
+def get_args():
+    p = argparse.ArgumentParser("Embedding micro-batching benchmark")
+    p.add_argument("--port", type=int, default=8081)
+    p.add_argument("-n", "--requests", type=int, default=1000)
+    p.add_argument("-c", "--concurrency", type=int, default=100)
+    p.add_argument("--windows", type=float, nargs="+", default=[0, 1, 2, 5, 10, 20])
+    p.add_argument("--max-batch-size", type=int, default=64)
+    p.add_argument("--embed-latency-ms", type=float, default=80.0)
+    p.add_argument("--max-concurrent", type=int, default=32, help="스텁 서버 동시 처리 한도")
+    return p.parse_args()
+
+
+async def run_window(client: AsyncOpenAI, args, window_ms: float) -> List[float]:
+    if window_ms > 0:
+        async def _send(texts: List[str]) -> List[List[float]]:
+            resp = await client.embeddings.create(input=texts, model="text-embedding-3-small")
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+        batcher = EmbeddingBatcher(_send, window_ms=window_ms, max_batch_size=args.max_batch_size)
+        embed = batcher.submit
+    else:
+        batcher = None
+
+        async def embed(text: str) -> List[float]:
+            resp = await client.embeddings.create(input=text, model="text-embedding-3-small")
+            return resp.data[0].embedding
+
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> float:
+        async with sem:
+            start = time.perf_counter()
+            await embed(f"벤치마크 메시지 {i}")
+            return time.perf_counter() - start
+
+    try:
+        return await asyncio.gather(*(one(i) for i in range(args.requests)))
+    finally:
+        if batcher is not None:
+            await batcher.aclose()
+
+
+async def main():
+    args = get_args()
+    config = StubConfig(embed_latency_ms=args.embed_latency_ms, max_concurrent=args.max_concurrent)
+    server, task, app = await start_stub_server(config, port=args.port)
+    client = AsyncOpenAI(api_key="stub", base_url=f"http://127.0.0.1:{args.port}/v1", max_retries=0)
+
+    report = {"requests": args.requests, "concurrency": args.concurrency, "results": []}
+    try:
+        for window_ms in args.windows:
+            stats = app.state.stats
+            before = stats.embedding_requests
+            start = time.perf_counter()
+            latencies = await run_window(client, args, window_ms)
+            result = summarize(latencies, time.perf_counter() - start)
+            result["window_ms"] = window_ms
+            result["api_calls"] = stats.embedding_requests - before
+            report["results"].append(result)
+    finally:
+        await client.close()
+        await stop_stub_server(server, task)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
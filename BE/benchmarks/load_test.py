@@ -0,0 +1,316 @@
+"""
+app.main:app 종단 간 부하 테스트
+
+OpenAI 대신 로컬 스텁 서버(benchmarks.stub_openai)를, Qdrant 대신 합성 데이터로 만든 LocalVectorIndex를 사용해
+실제 비용 없이 /api/chat/ (또는 /api/chat/stream) 처리량을 측정합니다.
+앱과 스텁은 별도 프로세스로 띄우고, 동시 요청 수(-c)만큼의 클라이언트가 요청을 보냅니다.
+결과는 RPS, p50/p95/p99, /metrics 기반 단계별(history/embedding/search/prompt/llm/db_write) 소요 시간을 JSON으로 출력하며
+--output으로 저장하고 --baseline으로 이전 결과와 비교할 수 있습니다.
+
+    # SQLite (pip install aiosqlite 필요)
+    python -m benchmarks.load_test -n 2000 -c 50 --output runs/base.json
+    # 설정 변경 후 비교
+    python -m benchmarks.load_test -n 2000 -c 50 --env SEMANTIC_CACHE_ENABLED=true --baseline runs/base.json
+    # 로컬 MySQL
+    python -m benchmarks.load_test --database-url mysql+aiomysql://user:pw@127.0.0.1:3306/mychat
+    # 이미 떠 있는 서버 (스텁/앱 기동 생략)
+    python -m benchmarks.load_test --target http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.utils.local_vector_index import META_FILE, PAYLOADS_FILE, VECTORS_FILE
+from benchmarks.common import print_report, summarize
+
+BE_DIR = Path(__file__).resolve().parent.parent
+STAGE_METRIC = "mychat_chat_stage_seconds"
+
+MESSAGES = [
+    "오늘 뭐해?", "밥 먹었어?", "주말에 시간 돼?", "그 영화 봤어?", "내일 몇 시에 만나?",
+    "요즘 어떻게 지내?", "ㅋㅋㅋ 진짜?", "퇴근했어?", "날씨 완전 춥다", "뭐 먹을래?",
+]
+
+
+def get_args():
+    p = argparse.ArgumentParser("End-to-end load test")
+    p.add_argument("-n", "--requests", type=int, default=1000)
+    p.add_argument("-c", "--concurrency", type=int, default=50)
+    p.add_argument("--warmup", type=int, default=20, help="측정 전 보내는 요청 수")
+    p.add_argument("--users", type=int, default=100, help="요청에 섞어 쓸 user_id 수")
+    p.add_argument("--endpoint", choices=["chat", "stream"], default="chat")
+    p.add_argument("--target", default=None, help="이미 떠 있는 앱 주소 (지정 시 스텁/앱을 띄우지 않음)")
+    p.add_argument("--app-port", type=int, default=8800)
+    p.add_argument("--workers", type=int, default=1, help="앱 워커 수 (단계별 지표는 1개 워커 기준)")
+    p.add_argument("--database-url", default=None, help="기본은 임시 디렉토리의 SQLite")
+    p.add_argument("--vector-backend", choices=["local", "qdrant"], default="local",
+                   help="qdrant면 --env QDRANT_HOST=... 로 지정한 실제 Qdrant 사용")
+    p.add_argument("--index-size", type=int, default=20000, help="합성 로컬 인덱스 벡터 수")
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="앱 설정 덮어쓰기 (반복 가능)")
+    # 스텁 OpenAI
+    p.add_argument("--stub-port", type=int, default=8081)
+    p.add_argument("--dim", type=int, default=1536)
+    p.add_argument("--embed-latency-ms", type=float, default=80.0)
+    p.add_argument("--chat-latency-ms", type=float, default=400.0)
+    p.add_argument("--token-interval-ms", type=float, default=20.0)
+    # 결과
+    p.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    p.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    return p.parse_args()
+
+
+# ─── 1. 테스트 환경 (합성 인덱스, 스텁, 앱 프로세스) ───
+def write_synthetic_index(out_dir: Path, count: int, dim: int) -> None:
+    """LocalVectorIndex 형식의 합성 인덱스를 만듭니다. (kakao_preprocess.py --local-index-dir 와 같은 형식)"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    with (out_dir / VECTORS_FILE).open("wb") as f:
+        for start in range(0, count, 4096):
+            chunk = rng.standard_normal((min(4096, count - start), dim)).astype(np.float32)
+            chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+            chunk.tofile(f)
+    with (out_dir / PAYLOADS_FILE).open("w", encoding="utf-8") as f:
+        for i in range(count):
+            payload = {"content": f"{MESSAGES[i % len(MESSAGES)]} 답장 {i}", "query_sender": f"친구{i % 20}",
+                       "response_sender": "나"}
+            f.write(json.dumps({"id": i, "payload": payload}, ensure_ascii=False) + "\n")
+    (out_dir / META_FILE).write_text(json.dumps({"dim": dim, "count": count, "model": "stub"}), encoding="utf-8")
+
+
+def spawn(cmd: List[str], env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    log = log_path.open("w")
+    return subprocess.Popen(cmd, cwd=BE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_ready(url: str, proc: subprocess.Popen, log_path: Path, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"프로세스가 종료되었습니다. 로그: {log_path}\n{log_path.read_text()[-2000:]}")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} 응답 없음 (로그: {log_path})")
+
+
+def app_env(args, workdir: Path, index_dir: Path) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.stub_port}/v1",
+        "DATABASE_URL": args.database_url or f"sqlite+aiosqlite:///{workdir / 'bench.db'}",
+        "DB_ECHO": "false",
+        "VECTOR_BACKEND": args.vector_backend,
+        "LOCAL_INDEX_PATH": str(index_dir),
+        "WEB_CONCURRENCY": str(args.workers),
+    })
+    # DATABASE_URL을 쓰더라도 필수 설정이므로 없으면 더미 값
+    for key in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME", "MAIN_SENDER"):
+        env.setdefault(key, "bench")
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+# ─── 2. 부하 생성 ───
+async def send_one(client: httpx.AsyncClient, endpoint: str, body: Dict[str, Any]) -> Optional[float]:
+    """요청 1건을 보내고 스트리밍이면 첫 토큰까지 시간(초)을 반환합니다. (실패 시 예외)"""
+    if endpoint == "chat":
+        resp = await client.post("/api/chat/", json=body)
+        resp.raise_for_status()
+        return None
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/chat/stream", json=body) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+            if line == "event: error":
+                raise RuntimeError("스트림 error 이벤트")
+    return first_token
+
+
+async def drive(base_url: str, args, total: int, seed: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    bodies = [
+        {"user_id": f"bench-user-{rng.integers(args.users)}",
+         "message": f"{MESSAGES[rng.integers(len(MESSAGES))]} {rng.integers(1000)}"}
+        for _ in range(total)
+    ]
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors: Dict[str, int] = {}
+    next_index = 0
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def worker():
+            nonlocal next_index
+            while next_index < total:
+                body = bodies[next_index]
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    ttft = await send_one(client, args.endpoint, body)
+                    latencies.append(time.perf_counter() - start)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(args.concurrency, total))))
+        elapsed = time.perf_counter() - start
+
+    result = {**summarize(latencies, elapsed), "errors": errors}
+    if ttfts:
+        result["ttft"] = summarize(ttfts)
+    return result
+
+
+# ─── 3. 단계별 지표 (/metrics 전후 차이) ───
+async def scrape_stages(base_url: str) -> Dict[str, Dict[str, Dict[float, float]]]:
+    """단계별 히스토그램을 {stage: {"buckets": {le: count}, "sum": s, "count": n}} 형태로 읽습니다."""
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        text = (await client.get("/metrics")).text
+    stages: Dict[str, Dict[str, Any]] = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != STAGE_METRIC:
+            continue
+        for sample in family.samples:
+            stage = stages.setdefault(sample.labels["stage"], {"buckets": {}, "sum": 0.0, "count": 0.0})
+            if sample.name.endswith("_bucket"):
+                stage["buckets"][float(sample.labels["le"])] = sample.value
+            elif sample.name.endswith("_sum"):
+                stage["sum"] = sample.value
+            elif sample.name.endswith("_count"):
+                stage["count"] = sample.value
+    return stages
+
+
+def bucket_quantile(buckets: Dict[float, float], count: float, q: float) -> float:
+    """누적 버킷에서 q 분위수가 속한 버킷의 상한(ms)을 반환합니다."""
+    target = q * count
+    for le in sorted(buckets):
+        if buckets[le] >= target:
+            return le * 1000.0
+    return float("inf")
+
+
+def stage_breakdown(before, after) -> Dict[str, Dict[str, float]]:
+    breakdown = {}
+    for name, cur in after.items():
+        prev = before.get(name, {"buckets": {}, "sum": 0.0, "count": 0.0})
+        count = cur["count"] - prev["count"]
+        if count <= 0:
+            continue
+        buckets = {le: v - prev["buckets"].get(le, 0.0) for le, v in cur["buckets"].items()}
+        breakdown[name] = {
+            "count": int(count),
+            "mean_ms": round((cur["sum"] - prev["sum"]) / count * 1000.0, 3),
+            "p50_ms_le": bucket_quantile(buckets, count, 0.50),
+            "p95_ms_le": bucket_quantile(buckets, count, 0.95),
+            "p99_ms_le": bucket_quantile(buckets, count, 0.99),
+        }
+    return breakdown
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, str]:
+    """주요 지표의 이전 결과 대비 변화율"""
+    diff = {}
+    for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+        old, new = baseline["load"].get(key), report["load"].get(key)
+        if old:
+            diff[key] = f"{(new - old) / old * 100:+.1f}%"
+    for stage, cur in report["stages"].items():
+        old = baseline.get("stages", {}).get(stage, {}).get("mean_ms")
+        if old:
+            diff[f"{stage}.mean_ms"] = f"{(cur['mean_ms'] - old) / old * 100:+.1f}%"
+    return diff
+
+
+# ─── 4. 실행 ───
+async def main():
+    args = get_args()
+    procs: List[subprocess.Popen] = []
+    workdir = Path(tempfile.mkdtemp(prefix="mychat-load-"))
+    base_url = args.target or f"http://127.0.0.1:{args.app_port}"
+    try:
+        if args.target is None:
+            stub_log = workdir / "stub.log"
+            procs.append(spawn([
+                sys.executable, "-m", "benchmarks.stub_openai", "--port", str(args.stub_port),
+                "--dim", str(args.dim), "--embed-latency-ms", str(args.embed_latency_ms),
+                "--chat-latency-ms", str(args.chat_latency_ms), "--token-interval-ms", str(args.token_interval_ms),
+            ], dict(os.environ), stub_log))
+            await wait_ready(f"http://127.0.0.1:{args.stub_port}/stats", procs[-1], stub_log)
+
+            index_dir = workdir / "local_index"
+            if args.vector_backend == "local":
+                write_synthetic_index(index_dir, args.index_size, args.dim)
+            app_log = workdir / "app.log"
+            procs.append(spawn([
+                sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                "--port", str(args.app_port), "--workers", str(args.workers), "--log-level", "warning",
+            ], app_env(args, workdir, index_dir), app_log))
+            await wait_ready(f"{base_url}/api/chat/sender", procs[-1], app_log)
+
+        if args.warmup:
+            await drive(base_url, args, args.warmup, seed=1)
+        before = await scrape_stages(base_url)
+        load = await drive(base_url, args, args.requests, seed=2)
+        after = await scrape_stages(base_url)
+
+        report = {
+            "config": {
+                "endpoint": args.endpoint,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "workers": args.workers,
+                "vector_backend": args.vector_backend,
+                "database": "external" if args.target else (args.database_url or "sqlite"),
+                "env": args.env,
+                "stub": {"embed_latency_ms": args.embed_latency_ms, "chat_latency_ms": args.chat_latency_ms,
+                         "token_interval_ms": args.token_interval_ms},
+            },
+            "load": load,
+            "stages": stage_breakdown(before, after),
+        }
+        if args.target is None:
+            async with httpx.AsyncClient() as client:
+                report["stub_stats"] = (await client.get(f"http://127.0.0.1:{args.stub_port}/stats")).json()
+            report["logs"] = str(workdir)
+        if args.baseline:
+            report["vs_baseline"] = compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    print_report(report)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+로컬 벡터 인덱스 vs Qdrant 지연 시간/재현율 비교
+
+같은 데이터(kakao_preprocess.py --local-index-dir 로 만든 파일과 같은 실행에서 업서트한 Qdrant 컬렉션)에
+같은 질의를 보내 정확 검색(로컬 exact)을 정답으로 삼아 recall@k와 지연 시간을 비교합니다.
+질의는 저장된 벡터에 잡음을 더해 만듭니다.
+
+    python -m benchmarks.local_index_vs_qdrant --index processed_data/local_index --nlist 256 --qdrant-host localhost
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.utils.Qdrant_client import QdrantClientAsync
+from app.utils.local_vector_index import LocalVectorIndex
+from benchmarks.common import print_report, summarize
+
+
+def get_args():
+    p = argparse.ArgumentParser("Local vector index vs Qdrant benchmark")
+    p.add_argument("--index", default="processed_data/local_index")
+    p.add_argument("--nlist", type=int, default=256, help="IVF 목록 수 (0이면 IVF 비교 생략)")
+    p.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    p.add_argument("--qdrant-host", default=None, help="지정하지 않으면 Qdrant 비교 생략")
+    p.add_argument("--qdrant-port", type=int, default=6333)
+    p.add_argument("--collection", default="kakao-chat")
+    p.add_argument("-q", "--queries", type=int, default=200)
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--noise", type=float, default=0.05)
+    return p.parse_args()
+
+
+def make_queries(index: LocalVectorIndex, n: int, noise: float) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    rows = rng.choice(len(index.vectors), size=min(n, len(index.vectors)), replace=False)
+    base = np.asarray(index.vectors[rows])
+    return base + rng.normal(scale=noise, size=base.shape).astype(np.float32)
+
+
+def recall(truth: List[List[str]], found: List[List[str]]) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    total = sum(len(t) for t in truth)
+    return hits / total if total else 0.0
+
+
+def run_local(index: LocalVectorIndex, queries: np.ndarray, k: int, exact: bool):
+    latencies, ids = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = index.search_sync(q.tolist(), limit=k, exact=exact)
+        latencies.append(time.perf_counter() - start)
+        ids.append([str(h.id) for h in hits])
+    return latencies, ids
+
+
+async def run_qdrant(args, queries: np.ndarray):
+    qc = await QdrantClientAsync.create(
+        host=args.qdrant_host, port=args.qdrant_port, collection_name=args.collection
+    )
+    latencies, ids = [], []
+    try:
+        for q in queries:
+            start = time.perf_counter()
+            hits = await qc.search(query_vector=q.tolist(), limit=args.top_k)
+            latencies.append(time.perf_counter() - start)
+            ids.append([str(h.id) for h in hits])
+    finally:
+        await qc.aclose()
+    return latencies, ids
+
+
+async def main():
+    args = get_args()
+    exact_index = LocalVectorIndex.load(args.index)
+    queries = make_queries(exact_index, args.queries, args.noise)
+    report: Dict[str, object] = {
+        "points": len(exact_index.vectors),
+        "dim": exact_index.vectors.shape[1],
+        "queries": len(queries),
+        "k": args.top_k,
+    }
+
+    latencies, truth = run_local(exact_index, queries, args.top_k, exact=True)
+    report["local_exact"] = {**summarize(latencies), "recall": 1.0}
+
+    if args.nlist > 0:
+        start = time.perf_counter()
+        ivf_index = LocalVectorIndex.load(args.index, nlist=args.nlist)
+        report["ivf_build_s"] = round(time.perf_counter() - start, 3)
+        for nprobe in args.nprobe:
+            ivf_index.nprobe = nprobe
+            latencies, found = run_local(ivf_index, queries, args.top_k, exact=False)
+            report[f"local_ivf_nlist{args.nlist}_nprobe{nprobe}"] = {
+                **summarize(latencies),
+                "recall": round(recall(truth, found), 4),
+            }
+
+    if args.qdrant_host:
+        latencies, found = await run_qdrant(args, queries)
+        report["qdrant"] = {**summarize(latencies), "recall": round(recall(truth, found), 4)}
+
+    print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+MMR 재정렬 CPU 비용과 다양성 측정
+
+근접 중복이 많은 후보 집합(카카오톡처럼 같은 말이 반복되는 상황)을 합성해
+후보 배수/λ 조합별 mmr_select 지연 시간(p50/p99)과 선택 결과의 평균 상호 유사도를 비교합니다.
+
+    python -m benchmarks.mmr_rerank --dim 1536 --multipliers 2 4 8 --lambdas 1.0 0.7 0.5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.mmr import mmr_select
+from benchmarks.common import print_report, summarize
+
+
+def get_args():
+    p = argparse.ArgumentParser("MMR rerank cost")
+    p.add_argument("--dim", type=int, default=1536)
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--multipliers", type=int, nargs="+", default=[2, 4, 8])
+    p.add_argument("--lambdas", type=float, nargs="+", default=[1.0, 0.7, 0.5, 0.3])
+    p.add_argument("--dup-groups", type=int, default=4, help="후보를 만드는 근접 중복 그룹 수")
+    p.add_argument("-n", "--iterations", type=int, default=500)
+    return p.parse_args()
+
+
+def make_candidates(rng, query, n, groups, dim):
+    """질문 근처의 소수 그룹 중심에 작은 잡음을 더해 근접 중복 후보를 만듭니다."""
+    centers = query + rng.normal(scale=0.5, size=(groups, dim)) / np.sqrt(dim)
+    return centers[rng.integers(0, groups, size=n)] + rng.normal(scale=0.05, size=(n, dim)) / np.sqrt(dim)
+
+
+def mean_pairwise_similarity(vectors) -> float:
+    v = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sim = v @ v.T
+    n = len(v)
+    return float((sim.sum() - n) / (n * (n - 1))) if n > 1 else 0.0
+
+
+def main():
+    args = get_args()
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=args.dim).astype(np.float32)
+    query /= np.linalg.norm(query)
+
+    results = []
+    for mult in args.multipliers:
+        cands = make_candidates(rng, query, args.top_k * mult, args.dup_groups, args.dim).astype(np.float32)
+        for lam in args.lambdas:
+            latencies = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                order = mmr_select(query, cands, args.top_k, lam)
+                latencies.append(time.perf_counter() - start)
+            results.append({
+                "candidates": len(cands),
+                "lambda": lam,
+                "selected_mean_similarity": round(mean_pairwise_similarity(cands[order]), 4),
+                **summarize(latencies),
+            })
+    print_report({"dim": args.dim, "k": args.top_k, "results": results})
+
+
+if __name__ == "__main__":
+    main()
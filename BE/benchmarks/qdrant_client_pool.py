@@ -0,0 +1,100 @@
+"""
+Qdrant 클라이언트 재사용 효과 측정
+
+요청마다 클라이언트를 생성/종료하던 기존 방식(per-request)과
+앱 수명 동안 하나의 연결 풀을 공유하는 방식(shared)의 요청당 지연 시간을 비교합니다.
+
+    python -m benchmarks.qdrant_client_pool --host localhost --port 6333 -n 500 -c 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+import httpx
+
+from app.utils.Qdrant_client import QdrantClientAsync
+from benchmarks.common import print_report, summarize
+
+
+def get_args():
+    p = argparse.ArgumentParser("Qdrant client pool benchmark")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=6333)
+    p.add_argument("--collection", default="kakao-chat")
+    p.add_argument("-n", "--requests", type=int, default=300)
+    p.add_argument("-c", "--concurrency", type=int, default=10)
+    p.add_argument("--dim", type=int, default=1536)
+    p.add_argument("--max-connections", type=int, default=100)
+    p.add_argument("--max-keepalive", type=int, default=20)
+    return p.parse_args()
+
+
+def random_vector(dim: int) -> List[float]:
+    return [random.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+async def run_per_request(args) -> List[float]:
+    """기존 방식: 요청마다 클라이언트 생성 → 컬렉션 확인 → 검색 → 종료"""
+    async def one() -> float:
+        start = time.perf_counter()
+        qc = await QdrantClientAsync.create(
+            host=args.host, port=args.port, collection_name=args.collection
+        )
+        try:
+            await qc.create_collection(vector_size=args.dim)
+            await qc.search(query_vector=random_vector(args.dim), limit=5)
+        finally:
+            await qc.aclose()
+        return time.perf_counter() - start
+
+    return await _drive(one, args)
+
+
+async def run_shared(args) -> List[float]:
+    """개선 방식: 공유 클라이언트 1개, 컬렉션 확인은 시작 시 1회"""
+    qc = await QdrantClientAsync.create(
+        host=args.host,
+        port=args.port,
+        collection_name=args.collection,
+        limits=httpx.Limits(
+            max_connections=args.max_connections,
+            max_keepalive_connections=args.max_keepalive,
+        ),
+    )
+    await qc.create_collection(vector_size=args.dim)
+
+    async def one() -> float:
+        start = time.perf_counter()
+        await qc.search(query_vector=random_vector(args.dim), limit=5)
+        return time.perf_counter() - start
+
+    try:
+        return await _drive(one, args)
+    finally:
+        await qc.aclose()
+
+
+async def _drive(one, args) -> List[float]:
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def guarded() -> float:
+        async with sem:
+            return await one()
+
+    return await asyncio.gather(*(guarded() for _ in range(args.requests)))
+
+
+async def main():
+    args = get_args()
+    report = {"requests": args.requests, "concurrency": args.concurrency}
+    for name, runner in (("per_request", run_per_request), ("shared", run_shared)):
+        start = time.perf_counter()
+        latencies = await runner(args)
+        report[name] = summarize(latencies, time.perf_counter() - start)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
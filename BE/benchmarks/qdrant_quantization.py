@@ -0,0 +1,180 @@
+"""
+Qdrant 벡터 양자화 모드 비교 리포트
+
+원본 컬렉션의 포인트를 양자화 모드별 임시 컬렉션(none / scalar / binary, 원본은 on_disk)에 복사한 뒤
+같은 질의로 RAM 추정치, 지연 시간(p50/p99), 원본 exact 검색 대비 top-k 일치율을 비교합니다.
+결과는 JSON으로 출력하고 --output 지정 시 Markdown 표로 저장합니다.
+
+    python -m benchmarks.qdrant_quantization --host localhost --points 20000 --output quantization_report.md
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
+
+from app.utils.Qdrant_client import QdrantClientAsync
+from benchmarks.common import print_report, summarize
+
+# 양자화 벡터 1차원당 바이트 (원본 float32 = 4)
+BYTES_PER_DIM = {"none": 4.0, "scalar": 1.0, "binary": 1.0 / 8}
+
+
+def get_args():
+    p = argparse.ArgumentParser("Qdrant quantization report")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=6333)
+    p.add_argument("--collection", default="kakao-chat")
+    p.add_argument("--modes", nargs="+", choices=["none", "scalar", "binary"], default=["none", "scalar", "binary"])
+    p.add_argument("--oversampling", type=float, nargs="+", default=[1.0, 2.0, 4.0])
+    p.add_argument("--points", type=int, default=20000, help="복사할 최대 포인트 수")
+    p.add_argument("-q", "--queries", type=int, default=200)
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--noise", type=float, default=0.05)
+    p.add_argument("--keep", action="store_true", help="비교용 임시 컬렉션을 삭제하지 않음")
+    p.add_argument("--output", default=None, help="Markdown 리포트 저장 경로")
+    return p.parse_args()
+
+
+def quantization_config(mode: str):
+    if mode == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+async def load_points(qc: QdrantClientAsync, limit: int):
+    points, offset = [], None
+    while len(points) < limit:
+        batch, offset = await qc.client.scroll(
+            collection_name=qc.collection_name,
+            limit=min(1000, limit - len(points)),
+            offset=offset,
+            with_vectors=True,
+            with_payload=True,
+        )
+        points.extend(batch)
+        if offset is None:
+            break
+    return points
+
+
+async def copy_collection(qc: QdrantClientAsync, name: str, mode: str, points, dim: int) -> float:
+    """양자화 모드별 컬렉션을 만들고 인덱싱이 끝날 때까지 기다립니다. (소요 시간 반환)"""
+    start = time.perf_counter()
+    await qc.client.recreate_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=mode != "none"),
+        quantization_config=quantization_config(mode),
+    )
+    for i in range(0, len(points), 500):
+        await qc.client.upsert(
+            collection_name=name,
+            points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points[i:i + 500]],
+            wait=True,
+        )
+    while (await qc.client.get_collection(name)).status != "green":
+        await asyncio.sleep(0.5)
+    return time.perf_counter() - start
+
+
+async def run(qc: QdrantClientAsync, name: str, queries: np.ndarray, k: int,
+              exact: bool = False, oversampling: Optional[float] = None, rescore: Optional[bool] = None):
+    qc_view = QdrantClientAsync(qc.client, collection_name=name)
+    latencies, ids = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = await qc_view.search(
+            query_vector=q.tolist(), limit=k, exact=exact,
+            quantization_oversampling=oversampling, quantization_rescore=rescore,
+        )
+        latencies.append(time.perf_counter() - start)
+        ids.append({str(h.id) for h in hits})
+    return latencies, ids
+
+
+def agreement(truth: List[set], found: List[set], k: int) -> float:
+    return sum(len(t & f) for t, f in zip(truth, found)) / (k * len(truth)) if truth else 0.0
+
+
+def to_markdown(report: Dict[str, object]) -> str:
+    lines = [
+        "# Qdrant 양자화 모드 비교",
+        "",
+        f"- 포인트: {report['points']}, 차원: {report['dim']}, 질의: {report['queries']}, k: {report['k']}",
+        "- RAM 추정치는 HNSW 그래프/payload를 제외한 검색용 벡터 크기입니다. (none=float32 RAM, 그 외=양자화 벡터 RAM + 원본 디스크)",
+        "",
+        "| mode | oversampling | rescore | RAM(MB) | p50(ms) | p99(ms) | top-k 일치율 |",
+        "| --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for r in report["results"]:
+        lines.append(
+            f"| {r['mode']} | {r['oversampling']} | {r['rescore']} | {r['ram_mb']} "
+            f"| {r['p50_ms']} | {r['p99_ms']} | {r['agreement']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+async def main():
+    args = get_args()
+    qc = await QdrantClientAsync.create(host=args.host, port=args.port, collection_name=args.collection)
+    created: List[str] = []
+    try:
+        points = await load_points(qc, args.points)
+        if not points:
+            raise SystemExit(f"컬렉션 '{args.collection}'에 포인트가 없습니다.")
+        dim = len(points[0].vector)
+        rng = np.random.default_rng(42)
+        picks = rng.choice(len(points), size=min(args.queries, len(points)), replace=False)
+        queries = np.asarray([points[i].vector for i in picks], dtype=np.float32)
+        queries += rng.normal(scale=args.noise, size=queries.shape).astype(np.float32)
+
+        # 정답: 원본 컬렉션 exact 검색
+        _, truth = await run(qc, args.collection, queries, args.top_k, exact=True)
+
+        report: Dict[str, object] = {"points": len(points), "dim": dim, "queries": len(queries), "k": args.top_k, "results": []}
+        for mode in args.modes:
+            name = f"{args.collection}-bench-{mode}"
+            created.append(name)
+            build_s = await copy_collection(qc, name, mode, points, dim)
+            ram_mb = round(len(points) * dim * BYTES_PER_DIM[mode] / 1024 / 1024, 2)
+
+            settings = [(None, None)] if mode == "none" else [(o, True) for o in args.oversampling] + [(1.0, False)]
+            for oversampling, rescore in settings:
+                latencies, found = await run(qc, name, queries, args.top_k, oversampling=oversampling, rescore=rescore)
+                report["results"].append({
+                    "mode": mode,
+                    "oversampling": oversampling,
+                    "rescore": rescore,
+                    "ram_mb": ram_mb,
+                    "build_s": round(build_s, 2),
+                    **summarize(latencies),
+                    "agreement": round(agreement(truth, found, args.top_k), 4),
+                })
+    finally:
+        if not args.keep:
+            for name in created:
+                await qc.client.delete_collection(name)
+        await qc.aclose()
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(to_markdown(report), encoding="utf-8")
+        print(f"리포트 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Qdrant 전송 방식(HTTP/gRPC)과 HNSW 검색 파라미터 sweep
+
+컬렉션에 저장된 벡터 일부에 잡음을 더해 질의를 만들고, exact=True 결과를 정답으로 삼아
+hnsw_ef / indexed_only 조합별 p50/p99 지연 시간과 overlap@k를 측정합니다.
+
+    python -m benchmarks.qdrant_search_params --host localhost --ef 16 32 64 128 256 --transports http grpc
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.Qdrant_client import QdrantClientAsync
+from benchmarks.common import print_report, summarize
+
+
+def get_args():
+    p = argparse.ArgumentParser("Qdrant search params sweep")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=6333)
+    p.add_argument("--grpc-port", type=int, default=6334)
+    p.add_argument("--collection", default="kakao-chat")
+    p.add_argument("--transports", nargs="+", choices=["http", "grpc"], default=["http", "grpc"])
+    p.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    p.add_argument("--indexed-only", action="store_true", help="각 ef에 대해 indexed_only=True도 측정")
+    p.add_argument("-q", "--queries", type=int, default=200)
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--noise", type=float, default=0.05)
+    return p.parse_args()
+
+
+async def sample_queries(qc: QdrantClientAsync, n: int, noise: float) -> np.ndarray:
+    """컬렉션에서 벡터를 가져와 잡음을 더한 질의 벡터를 만듭니다."""
+    points, _ = await qc.client.scroll(
+        collection_name=qc.collection_name, limit=n, with_vectors=True, with_payload=False
+    )
+    base = np.asarray([p.vector for p in points], dtype=np.float32)
+    rng = np.random.default_rng(42)
+    return base + rng.normal(scale=noise, size=base.shape).astype(np.float32)
+
+
+async def run(
+    qc: QdrantClientAsync,
+    queries: np.ndarray,
+    k: int,
+    hnsw_ef: Optional[int] = None,
+    exact: bool = False,
+    indexed_only: bool = False,
+):
+    latencies, ids = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = await qc.search(
+            query_vector=q.tolist(), limit=k, hnsw_ef=hnsw_ef, exact=exact, indexed_only=indexed_only
+        )
+        latencies.append(time.perf_counter() - start)
+        ids.append({str(h.id) for h in hits})
+    return latencies, ids
+
+
+def overlap(truth: List[set], found: List[set], k: int) -> float:
+    return sum(len(t & f) for t, f in zip(truth, found)) / (k * len(truth)) if truth else 0.0
+
+
+async def main():
+    args = get_args()
+    report: Dict[str, object] = {"queries": args.queries, "k": args.top_k, "results": []}
+
+    for transport in args.transports:
+        qc = await QdrantClientAsync.create(
+            host=args.host,
+            port=args.port,
+            grpc_port=args.grpc_port,
+            prefer_grpc=transport == "grpc",
+            collection_name=args.collection,
+        )
+        try:
+            queries = await sample_queries(qc, args.queries, args.noise)
+            latencies, truth = await run(qc, queries, args.top_k, exact=True)
+            report["results"].append({"transport": transport, "mode": "exact", **summarize(latencies), "overlap": 1.0})
+
+            for ef in args.ef:
+                for indexed_only in ([False, True] if args.indexed_only else [False]):
+                    latencies, found = await run(qc, queries, args.top_k, hnsw_ef=ef, indexed_only=indexed_only)
+                    report["results"].append({
+                        "transport": transport,
+                        "mode": f"hnsw_ef={ef}" + (",indexed_only" if indexed_only else ""),
+                        **summarize(latencies),
+                        "overlap": round(overlap(truth, found, args.top_k), 4),
+                    })
+        finally:
+            await qc.aclose()
+
+    print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,203 @@
+"""
+로컬 OpenAI 호환 스텁 서버
+
+실제 OpenAI를 호출하지 않고 지연 시간만 흉내 내는 /v1/embeddings, /v1/chat/completions 엔드포인트를 제공합니다.
+벤치마크 스크립트에서 start_stub_server()로 띄우거나 단독으로 실행할 수 있습니다.
+
+    python -m benchmarks.stub_openai --port 8081 --embed-latency-ms 80
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    dim: int = 1536
+    embed_latency_ms: float = 80.0     # 배치 1회 기본 지연
+    embed_per_item_ms: float = 0.2     # 배치 항목당 추가 지연
+    chat_latency_ms: float = 400.0     # 첫 토큰까지 지연
+    token_interval_ms: float = 20.0    # 스트리밍 토큰 간격
+    reply: str = "스텁 답변이에요 ㅋㅋ 오늘 뭐해?"
+    max_concurrent: Optional[int] = None  # 서버 동시 처리 한도 (rate limit 흉내)
+
+
+@dataclass
+class StubStats:
+    embedding_requests: int = 0
+    embedding_inputs: int = 0
+    chat_requests: int = 0
+    batch_sizes: Dict[int, int] = field(default_factory=dict)
+
+
+def stub_vector(text: str, dim: int) -> np.ndarray:
+    """텍스트별로 결정적인 단위 벡터 (같은 텍스트 → 같은 벡터)"""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI()
+    stats = StubStats()
+    app.state.stats = stats
+    limiter = asyncio.Semaphore(config.max_concurrent) if config.max_concurrent else None
+
+    async def _limited(coro):
+        if limiter is None:
+            return await coro
+        async with limiter:
+            return await coro
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body: Dict[str, Any] = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        stats.embedding_requests += 1
+        stats.embedding_inputs += len(inputs)
+        stats.batch_sizes[len(inputs)] = stats.batch_sizes.get(len(inputs), 0) + 1
+
+        delay = (config.embed_latency_ms + config.embed_per_item_ms * len(inputs)) / 1000.0
+        await _limited(asyncio.sleep(delay))
+
+        dim = int(body.get("dimensions") or config.dim)
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vec = stub_vector(text, dim)
+            embedding = base64.b64encode(vec.tobytes()).decode() if as_base64 else vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(t) for t in inputs)
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        stats.chat_requests += 1
+        model = body.get("model")
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 2
+        tokens: List[str] = config.reply.split(" ")
+
+        if not body.get("stream"):
+            await _limited(asyncio.sleep((config.chat_latency_ms + config.token_interval_ms * len(tokens)) / 1000.0))
+            return JSONResponse({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": config.reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens),
+                },
+            })
+
+        async def stream():
+            await asyncio.sleep(config.chat_latency_ms / 1000.0)
+            for i, token in enumerate(tokens):
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": token if i == 0 else f" {token}"},
+                        "finish_reason": None,
+                    }],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(config.token_interval_ms / 1000.0)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": prompt_tokens + len(tokens),
+                    },
+                }
+                yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return {
+            "embedding_requests": stats.embedding_requests,
+            "embedding_inputs": stats.embedding_inputs,
+            "chat_requests": stats.chat_requests,
+            "batch_sizes": stats.batch_sizes,
+        }
+
+    return app
+
+
+async def start_stub_server(config: StubConfig, host: str = "127.0.0.1", port: int = 8081):
+    """스텁 서버를 현재 이벤트 루프에서 백그라운드로 띄우고 (server, task, app)을 반환합니다."""
+    app = create_app(config)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()  # 포트 충돌 등 기동 실패 시 예외 전파
+        await asyncio.sleep(0.01)
+    return server, task, app
+
+
+async def stop_stub_server(server, task) -> None:
+    server.should_exit = True
+    await task
+
+
+def get_args():
+    p = argparse.ArgumentParser("OpenAI-compatible stub server")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8081)
+    p.add_argument("--dim", type=int, default=1536)
+    p.add_argument("--embed-latency-ms", type=float, default=80.0)
+    p.add_argument("--embed-per-item-ms", type=float, default=0.2)
+    p.add_argument("--chat-latency-ms", type=float, default=400.0)
+    p.add_argument("--token-interval-ms", type=float, default=20.0)
+    p.add_argument("--max-concurrent", type=int, default=None)
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    config = StubConfig(
+        dim=args.dim,
+        embed_latency_ms=args.embed_latency_ms,
+        embed_per_item_ms=args.embed_per_item_ms,
+        chat_latency_ms=args.chat_latency_ms,
+        token_interval_ms=args.token_interval_ms,
+        max_concurrent=args.max_concurrent,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,8 @@
+-- 기존 배포 환경의 chat 테이블에 (user_id, timestamp) 복합 인덱스를 추가합니다.
+-- 앱 시작 시 app/config/migrations.py가 같은 인덱스를 자동으로 추가하지만,
+-- 행이 많은 테이블은 배포 전에 아래 온라인 DDL로 미리 적용하는 것을 권장합니다. (MySQL 8.0)
+
+ALTER TABLE chat
+    ADD INDEX ix_chat_user_id_timestamp (user_id, timestamp),
+    ALGORITHM = INPLACE,
+    LOCK = NONE;
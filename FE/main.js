@@ -6,6 +6,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const typingIndicator = document.getElementById('typing-indicator');
 
     const USER_ID = "test_user_123"; // 임시 사용자 ID
+    let isSending = false; // 응답 대기 중 중복 전송(더블 클릭/엔터 연타) 방지
 
     // Fetch and set chatbot name
     async function setChatbotName() {
@@ -39,18 +40,39 @@ document.addEventListener('DOMContentLoaded', () => {
         messageElement.textContent = message;
         chatMessages.insertBefore(messageElement, typingIndicator); // 타이핑 인디케이터 전에 메시지 추가
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageElement;
+    }
+
+    // SSE 프레임("event: ...\ndata: ...")을 { event, data } 객체로 변환
+    function parseSseFrame(frame) {
+        let event = 'message';
+        const dataLines = [];
+        for (const line of frame.split('\n')) {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        }
+        if (dataLines.length === 0) return null;
+        return { event, data: JSON.parse(dataLines.join('\n')) };
     }
 
     async function sendMessage() {
         const message = messageInput.value.trim();
-        if (!message) return;
+        if (!message || isSending) return;
 
+        isSending = true;
+        sendButton.disabled = true;
         appendMessage('user', `${message}`);
         messageInput.value = '';
         showTypingIndicator();
 
+        let aiMessageElement = null;
+
         try {
-            const response = await await fetch('/api/chat/', { // URL 수정
+            // 스트리밍 엔드포인트: 토큰이 도착하는 대로 화면에 그림
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -65,14 +87,49 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
-            appendMessage('ai', `${data.response_msg}`);
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // 완성된 프레임(빈 줄로 구분)만 처리하고 나머지는 버퍼에 유지
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = parseSseFrame(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                    if (!frame) continue;
+
+                    if (frame.event === 'token') {
+                        if (!aiMessageElement) {
+                            hideTypingIndicator();
+                            aiMessageElement = appendMessage('ai', '');
+                        }
+                        aiMessageElement.textContent += frame.data.delta;
+                        chatMessages.scrollTop = chatMessages.scrollHeight;
+                    } else if (frame.event === 'done') {
+                        if (!aiMessageElement) {
+                            aiMessageElement = appendMessage('ai', '');
+                        }
+                        aiMessageElement.textContent = frame.data.response_msg;
+                    } else if (frame.event === 'error') {
+                        console.error('스트리밍 처리 중 오류:', frame.data.message);
+                    }
+                }
+            }
 
         } catch (error) {
             console.error('채팅 요청 중 오류 발생:', error);
-            appendMessage('ai', '죄송합니다. 메시지를 처리하는 중 오류가 발생했습니다.');
+            if (!aiMessageElement) {
+                appendMessage('ai', '죄송합니다. 메시지를 처리하는 중 오류가 발생했습니다.');
+            }
         } finally {
             hideTypingIndicator();
+            isSending = false;
+            sendButton.disabled = false;
         }
     }
 
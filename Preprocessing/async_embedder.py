@@ -0,0 +1,248 @@
+"""
+비동기 임베딩 실행기 (kakao_preprocess.py 임베딩 단계)
+
+- 동시에 보내는 임베딩 요청 수를 max_in_flight로 제한
+- RPM/TPM token bucket으로 요금제 한도 안에서 요청 (429를 받기 전에 미리 대기)
+- 429 등 일시적 오류는 Retry-After를 따르거나 jitter 섞인 지수 백오프로 배치 단위 재시도
+- 끝내 실패한 배치는 실행 전체를 중단하지 않고 실패로 보고 (임베딩 캐시/--incremental로 다음 실행에서 채움)
+  단, 인증/권한/모델 없음 오류나 연속 실패가 이어지면 EmbeddingAborted로 즉시 중단
+- 제한 대기 시간과 실제 요청 시간을 따로 집계
+"""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from embedding_provider import EmbeddingProvider
+from embedding_store import EmbeddingStore
+
+
+class EmbeddingAborted(RuntimeError):
+    """계속 진행해도 모든 배치가 실패할 상황 (잘못된 키/권한/모델, 연속 실패)"""
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 보수적으로 추정 (한글 1글자≈1토큰, 영문은 과대 추정)"""
+    return max(1, len(text.encode("utf-8")) // 3)
+
+
+class TokenBucket:
+    """분당 한도(per_minute)를 초당 비율로 채우는 bucket (최대 1분치까지 모아 둠)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def take(self, amount: float):
+        amount = min(amount, self.capacity)  # 한도보다 큰 요청도 언젠가는 통과하도록
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """RPM/TPM 두 bucket과 429 이후의 전체 일시 정지(pause)를 함께 관리 (0이면 해당 한도 없음)"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()  # 먼저 기다린 요청이 먼저 통과 (FIFO)
+
+    async def acquire(self, tokens: int) -> float:
+        """한도 안에 들 때까지 기다리고, 기다린 시간(초)을 반환"""
+        start = time.monotonic()
+        async with self._lock:
+            while (wait := self.paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(wait)
+            if self.requests:
+                await self.requests.take(1)
+            if self.tokens:
+                await self.tokens.take(tokens)
+        return time.monotonic() - start
+
+    def settle(self, estimated: int, actual: int):
+        """추정 토큰과 실제 사용량의 차이를 TPM bucket에 반영"""
+        if self.tokens and actual:
+            self.tokens.refund(estimated - actual)
+
+    def pause(self, seconds: float):
+        """서버가 알려 준 시간 동안 새 요청을 모두 멈춤"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(error) -> Optional[float]:
+    """OpenAI 오류 응답의 retry-after-ms / retry-after 헤더 (초 또는 HTTP 날짜)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error) -> bool:
+    """429, 408/409, 5xx, 연결/타임아웃 오류만 재시도 (잘못된 요청/인증 오류는 즉시 실패)"""
+    try:
+        import openai
+    except ImportError:
+        return False
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+def is_fatal(error) -> bool:
+    """재시도하거나 다음 배치로 넘어가도 소용없는 오류 (401/403/404)"""
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError, openai.NotFoundError))
+
+
+class EmbedStats:
+    """요청별 시간 합계 (동시에 여러 요청이 진행되므로 wall time보다 클 수 있음)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.failed_texts = 0
+        self.useful = 0.0     # 성공한 요청의 응답 대기 시간
+        self.throttled = 0.0  # RPM/TPM 대기 + Retry-After/백오프 대기
+        self.wasted = 0.0     # 실패한 요청의 응답 대기 시간
+
+    def summary(self) -> str:
+        total = self.useful + self.throttled + self.wasted
+        share = self.throttled / total if total else 0.0
+        return (f"임베딩 요청 {self.calls}회 (재시도 {self.retries}회, 실패 배치 {self.failed_batches}개/{self.failed_texts}건) | "
+                f"유효 {self.useful:.1f}s, 제한 대기 {self.throttled:.1f}s ({share:.0%}), 실패 요청 {self.wasted:.1f}s")
+
+
+class AsyncEmbedder:
+    """
+    texts → (행렬, 실패한 인덱스 집합)
+    캐시(store)에 없는 텍스트만 provider.batch_size 단위 요청으로 나눠 동시에 보냅니다.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, store: Optional[EmbeddingStore] = None, *,
+                 max_in_flight: int = 8, rpm: float = 0, tpm: float = 0,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_consecutive_failures: int = 5):
+        self.provider = provider
+        self.store = store
+        self.limiter = RateLimiter(rpm, tpm) if provider.rate_limited else None
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_consecutive_failures = max_consecutive_failures
+        self._consecutive_failures = 0
+        self.stats = EmbedStats()
+        self._semaphore = None
+
+    async def embed(self, texts: List[str]) -> Tuple[np.ndarray, Set[int]]:
+        provider = self.provider
+        out = np.empty((len(texts), provider.dim), dtype=np.float32)
+        cached = {}
+        if self.store:
+            cached = await asyncio.to_thread(self.store.get_many, provider.name, provider.dim, texts)
+        for i, vec in cached.items():
+            out[i] = vec
+        missing = [i for i in range(len(texts)) if i not in cached]
+        chunks = [missing[i:i + provider.batch_size] for i in range(0, len(missing), provider.batch_size)]
+
+        failed = set()
+        results = await asyncio.gather(*(self._embed_chunk([texts[i] for i in idx]) for idx in chunks))
+        for idx, vecs in zip(chunks, results):
+            if vecs is None:
+                failed.update(idx)
+            else:
+                out[idx] = vecs
+        return out, failed
+
+    async def _embed_chunk(self, chunk: List[str]) -> Optional[np.ndarray]:
+        """한 요청 단위 배치를 재시도하며 임베딩 (끝내 실패하면 None)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)  # 실행 중인 이벤트 루프에서 생성
+        estimated = sum(estimate_tokens(t) for t in chunk)
+        stats = self.stats
+
+        for attempt in range(1, self.max_retries + 1):
+            async with self._semaphore:
+                if self.limiter:
+                    stats.throttled += await self.limiter.acquire(estimated)
+                start = time.monotonic()
+                stats.calls += 1
+                try:
+                    vecs, tokens = await self.provider.aembed_with_tokens(chunk)
+                except Exception as e:
+                    stats.wasted += time.monotonic() - start
+                    error = e
+                else:
+                    stats.useful += time.monotonic() - start
+                    self._consecutive_failures = 0
+                    if self.limiter:
+                        self.limiter.settle(estimated, sum(tokens))
+                    if self.store:
+                        await asyncio.to_thread(
+                            self.store.put_many, self.provider.name, self.provider.dim, chunk, vecs, tokens
+                        )
+                    return vecs
+
+            if is_fatal(error):
+                raise EmbeddingAborted(f"{type(error).__name__}: {error}") from error
+            if not is_retryable(error) or attempt == self.max_retries:
+                print(f"  ❌ 임베딩 실패 ({len(chunk)}건, 시도 {attempt}회): {type(error).__name__}: {error}")
+                break
+            # Retry-After가 있으면 그만큼 모든 요청을 멈추고, 없으면 full jitter 지수 백오프
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, self.base_delay)
+                if self.limiter:
+                    self.limiter.pause(retry_after)
+            else:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+            stats.retries += 1
+            print(f"  ⏳ 임베딩 재시도 {attempt}/{self.max_retries - 1} ({type(error).__name__}), {delay:.1f}s 후")
+            await asyncio.sleep(delay)
+            stats.throttled += delay
+
+        stats.failed_batches += 1
+        stats.failed_texts += len(chunk)
+        self._consecutive_failures += 1
+        if self.max_consecutive_failures and self._consecutive_failures >= self.max_consecutive_failures:
+            raise EmbeddingAborted(f"임베딩 요청 배치가 연속 {self._consecutive_failures}번 실패했습니다.") from error
+        return None
+
+    async def aclose(self):
+        await self.provider.aclose()
@@ -0,0 +1,161 @@
+"""
+임베딩 백엔드 (kakao_preprocess.py --embedding-provider)
+
+- openai : OpenAI embeddings API
+- local  : 로컬 경로의 sentence-transformers 모델 (CPU, torch 또는 ONNX 백엔드)
+- hashing: 문자 n-gram feature hashing (외부 호출 없는 결정적 임베딩, 테스트용)
+
+BE/app/utils/embedding_provider.py 와 name/차원/hashing 알고리즘이 같아야 적재한 벡터와 BE의 질문 벡터가 같은 공간에 놓입니다.
+수정 후 BE 디렉토리에서 `python -m benchmarks.check_embedding_parity` 로 두 구현이 일치하는지 확인하세요.
+"""
+import asyncio
+import hashlib
+import unicodedata
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+OPENAI_EMBEDDING_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+# 1M 토큰당 USD (임베딩 캐시의 절약 비용 계산용, 요금 변경 시 --embedding-price로 덮어씀)
+OPENAI_EMBEDDING_PRICES = {
+    "text-embedding-3-small": 0.02,
+    "text-embedding-3-large": 0.13,
+    "text-embedding-ada-002": 0.10,
+}
+
+
+class EmbeddingProvider:
+    """텍스트 목록 → (n, dim) float32 행렬"""
+
+    name: str
+    dim: int
+    batch_size: int = 96  # 임베딩 요청 하나에 넣는 텍스트 수
+    price_per_1m: float = 0.0  # 1M 토큰당 USD (과금 없는 provider는 0)
+    rate_limited: bool = False  # RPM/TPM 한도가 있는 원격 API 여부
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_with_tokens(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """임베딩 행렬과 텍스트별 사용 토큰 수 (토큰 과금이 없으면 0)"""
+        return self.embed(texts), [0] * len(texts)
+
+    async def aembed_with_tokens(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """비동기 버전 (기본: 동기 구현을 스레드에서 실행)"""
+        return await asyncio.to_thread(self.embed_with_tokens, texts)
+
+    async def aclose(self):
+        return None
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        if dimensions is None and model not in OPENAI_EMBEDDING_DIMS:
+            raise ValueError(f"임베딩 모델 '{model}'의 차원을 알 수 없습니다. --embedding-dimensions를 지정하세요.")
+        self.model = model
+        self.dimensions = dimensions
+        self.dim = dimensions or OPENAI_EMBEDDING_DIMS[model]
+        self.name = model if dimensions is None else f"{model}|dimensions={dimensions}"
+        self.price_per_1m = OPENAI_EMBEDDING_PRICES.get(model, 0.0)
+        self.rate_limited = True
+        self._async_client = None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.embed_with_tokens(texts)[0]
+
+    def embed_with_tokens(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        import openai
+
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        return self._parse(texts, openai.embeddings.create(model=self.model, input=texts, **kwargs))
+
+    async def aembed_with_tokens(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        if self._async_client is None:
+            import openai
+
+            # 재시도/Retry-After는 AsyncEmbedder가 한도와 함께 처리하므로 SDK 자체 재시도는 끔
+            self._async_client = openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0)
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        resp = await self._async_client.embeddings.create(model=self.model, input=texts, **kwargs)
+        return self._parse(texts, resp)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    @staticmethod
+    def _parse(texts: List[str], resp) -> Tuple[np.ndarray, List[int]]:
+        data = sorted(resp.data, key=lambda d: d.index)
+        vectors = np.asarray([d.embedding for d in data], dtype=np.float32)
+        # usage는 배치 합계만 주므로 글자 수 비율로 텍스트마다 나눠 기록
+        total = resp.usage.total_tokens if resp.usage else 0
+        chars = sum(len(t) for t in texts) or 1
+        return vectors, [round(total * len(t) / chars) for t in texts]
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, model_path: str, backend: str = "torch", batch_size: int = 32):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("--embedding-provider local 에는 sentence-transformers 패키지가 필요합니다.") from e
+
+        kwargs = {"backend": backend} if backend != "torch" else {}
+        self.model = SentenceTransformer(model_path, device="cpu", **kwargs)
+        self.batch_size = batch_size
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.name = f"local:{model_path}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """단어와 문자 2/3-gram을 부호 있는 해시로 dim 차원에 누적한 뒤 L2 정규화"""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+        self.batch_size = 1024
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        text = " ".join(unicodedata.normalize("NFC", text).lower().split())
+        padded = f" {text} "
+        feats = [f"w:{w}" for w in text.split()]
+        for n in (2, 3):
+            feats.extend(f"c{n}:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return feats
+
+    def embed_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += -1.0 if h >> 63 else 1.0
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed_one(t) for t in texts])
+
+
+def create_provider(kind: str, *, model: str, dimensions: Optional[int] = None, model_path: str = "",
+                    backend: str = "torch", hashing_dim: int = 256) -> EmbeddingProvider:
+    if kind == "openai":
+        return OpenAIEmbeddingProvider(model, dimensions)
+    if kind == "local":
+        return LocalEmbeddingProvider(model_path, backend=backend)
+    if kind == "hashing":
+        return HashingEmbeddingProvider(hashing_dim)
+    raise ValueError(f"알 수 없는 임베딩 provider: {kind}")
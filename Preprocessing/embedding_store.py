@@ -0,0 +1,128 @@
+"""
+임베딩 영구 캐시 (kakao_preprocess.py --embedding-cache)
+
+- SQLite 파일 하나에 (model, dim, sha256(text)) → float32 벡터 blob 저장
+- model 은 provider.name (openai 는 dimensions 포함) 이므로 모델/차원이 바뀌면 자동으로 다른 키
+- 같은 텍스트를 다시 임베딩하지 않도록 AsyncEmbedder가 요청 전 조회, 응답 후 저장
+- tokens: 임베딩 당시 사용한 토큰 수 추정치 (캐시 적중 시 절약한 비용 계산용)
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SQLITE_MAX_PARAMS = 500  # IN (...) 한 번에 넘길 해시 수 (SQLite 변수 개수 제한보다 작게)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """임베딩 워커 여러 스레드가 함께 쓰므로 연결 하나를 lock으로 보호합니다."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model        TEXT NOT NULL,
+                dim          INTEGER NOT NULL,
+                text_hash    TEXT NOT NULL,
+                vector       BLOB NOT NULL,
+                tokens       INTEGER NOT NULL DEFAULT 0,
+                created_at   REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (model, dim, text_hash)
+            )
+            """
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self.spent_tokens = 0
+
+    def get_many(self, model: str, dim: int, texts: List[str]) -> Dict[int, np.ndarray]:
+        """texts 중 캐시에 있는 항목을 {인덱스: 벡터}로 반환하고 사용 시각을 갱신"""
+        hashes = [text_hash(t) for t in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), SQLITE_MAX_PARAMS):
+                chunk = list(set(hashes[i:i + SQLITE_MAX_PARAMS]))
+                rows = self._db.execute(
+                    f"SELECT text_hash, vector, tokens FROM embeddings WHERE model = ? AND dim = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    (model, dim, *chunk),
+                ).fetchall()
+                found.update((h, (vec, tokens)) for h, vec, tokens in rows)
+            if found:
+                self._db.executemany(
+                    "UPDATE embeddings SET last_used_at = ? WHERE model = ? AND dim = ? AND text_hash = ?",
+                    [(time.time(), model, dim, h) for h in found],
+                )
+                self._db.commit()
+
+            hits = {}
+            for i, h in enumerate(hashes):
+                if h in found:
+                    vec, tokens = found[h]
+                    hits[i] = np.frombuffer(vec, dtype=np.float32)
+                    self.saved_tokens += tokens
+            self.hits += len(hits)
+            self.misses += len(texts) - len(hits)
+        return hits
+
+    def put_many(self, model: str, dim: int, texts: List[str], vectors: np.ndarray, tokens: List[int]):
+        now = time.time()
+        rows = [
+            (model, dim, text_hash(t), np.asarray(v, dtype=np.float32).tobytes(), n, now, now)
+            for t, v, n in zip(texts, vectors, tokens)
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dim, text_hash, vector, tokens, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+            self.spent_tokens += sum(tokens)
+
+    def summary(self, price_per_1m: float) -> str:
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups if lookups else 0.0
+        saved = self.saved_tokens * price_per_1m / 1_000_000
+        spent = self.spent_tokens * price_per_1m / 1_000_000
+        return (f"임베딩 캐시: 적중 {self.hits}/{lookups} ({ratio:.1%}), "
+                f"절약 {self.saved_tokens} tokens ≈ ${saved:.4f}, 신규 {self.spent_tokens} tokens ≈ ${spent:.4f}")
+
+    def compact(self, max_age_days: Optional[float] = None, keep_model: Optional[str] = None):
+        """
+        오래 쓰이지 않은 항목(max_age_days)과 다른 모델의 항목(keep_model 지정 시)을 지우고
+        VACUUM으로 파일 크기를 줄입니다. → (삭제 행 수, 이전 크기, 이후 크기)
+        """
+        before = self.path.stat().st_size
+        deleted = 0
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                deleted += self._db.execute("DELETE FROM embeddings WHERE last_used_at < ?", (cutoff,)).rowcount
+            if keep_model is not None:
+                deleted += self._db.execute("DELETE FROM embeddings WHERE model != ?", (keep_model,)).rowcount
+            self._db.commit()
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._db.execute("VACUUM")
+        return deleted, before, self.path.stat().st_size
+
+    def close(self):
+        with self._lock:
+            self._db.close()
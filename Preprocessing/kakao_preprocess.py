@@ -1,24 +1,64 @@
 """
 KakaoTalk txt → JSON + Qdrant 업서트 스크립트 (DEBUG 강화, 멀티스레딩)
+파일 전체를 메모리에 올리지 않고 parse → merge → pair → embed → upsert를 배치 단위로 흘려보냅니다.
 """
 
 import argparse
+import asyncio
 import json
 import os
+import queue
 import re
+import sys
+import threading
+import time
+import unicodedata
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from itertools import groupby, islice
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import chain, groupby, islice
 from pathlib import Path
 
+import numpy as np
 import openai
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, VectorParams
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    PayloadSchemaType,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from async_embedder import AsyncEmbedder, EmbeddingAborted
+from embedding_provider import EmbeddingProvider, create_provider
+from embedding_store import EmbeddingStore
+
+try:
+    import resource  # peak RSS 측정 (Unix 전용)
+except ImportError:
+    resource = None
 
 # ───────────────── 기본 설정 ─────────────────────────────────────
 MAIN_SENDER = os.getenv("MAIN_SENDER", "홍길동")  # ★ 메인 화자
-MODEL = "text-embedding-3-small"
+MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")  # openai provider 모델 (BE와 동일)
 openai.api_key = os.getenv("OPENAI_API_KEY")
+KAKAO_TZ = timezone(timedelta(hours=int(os.getenv("KAKAO_TZ_OFFSET", "9"))))  # 내보내기 파일의 시각 기준 (KST)
+
+# 필터 검색용 payload 인덱스 (필드명 → 스키마)
+PAYLOAD_INDEXES = {
+    "query_sender": PayloadSchemaType.KEYWORD,
+    "response_sender": PayloadSchemaType.KEYWORD,
+    "timestamp": PayloadSchemaType.DATETIME,
+}
+
+# 대화 쌍 내용으로 만드는 결정적 point id의 네임스페이스 (바꾸면 기존 포인트와 id가 모두 달라짐)
+PAIR_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "mychat/kakao-pair")
 
 # ───────────────── CLI 파서 ──────────────────────────────────────
 def get_args():
@@ -29,178 +69,706 @@ def get_args():
     p.add_argument("--qdrant-host", default="qdrant")
     p.add_argument("--qdrant-port", type=int, default=6333)
     p.add_argument("--collection", default="kakao-chat")
-    p.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
-    return p.parse_args()
+    p.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="파일 파싱 스레드 수")
+    p.add_argument("--batch-size", type=int, default=256,
+                   help="임베딩/업서트 단위 대화 쌍 수 (메모리 사용량 ≈ batch × (큐 + 워커 수))")
+    p.add_argument("--embed-workers", type=int, default=4, help="동시에 임베딩하는 파이프라인 배치 수")
+    p.add_argument("--max-in-flight", type=int, default=8, help="동시에 보내는 임베딩 API 요청 수")
+    p.add_argument("--rpm", type=float, default=float(os.getenv("EMBEDDING_RPM", "3000")),
+                   help="임베딩 API 분당 요청 한도 (0=제한 없음, openai provider에만 적용)")
+    p.add_argument("--tpm", type=float, default=float(os.getenv("EMBEDDING_TPM", "1000000")),
+                   help="임베딩 API 분당 토큰 한도 (0=제한 없음, openai provider에만 적용)")
+    p.add_argument("--max-retries", type=int, default=6, help="임베딩 요청 하나의 최대 시도 횟수")
+    p.add_argument("--retry-base-delay", type=float, default=1.0, help="재시도 백오프 기본 대기(초)")
+    p.add_argument("--retry-max-delay", type=float, default=60.0, help="재시도 백오프 최대 대기(초)")
+    p.add_argument("--max-consecutive-failures", type=int, default=5,
+                   help="임베딩 요청 배치가 연속으로 이만큼 실패하면 실행 중단 (0=중단 안 함)")
+    p.add_argument("--upsert-workers", type=int, default=2, help="동시에 실행하는 업서트 배치 수")
+    p.add_argument("--queue-batches", type=int, default=4, help="단계 사이 큐에 쌓아 둘 수 있는 배치 수 (backpressure)")
+    p.add_argument("--local-index-dir", default=None,
+                   help="BE의 LocalVectorIndex용 파일(vectors.f32, payloads.jsonl, meta.json)을 저장할 디렉토리")
+    p.add_argument("--skip-qdrant", action="store_true", help="Qdrant 업서트 생략 (로컬 인덱스만 생성)")
+    p.add_argument("--quantization", choices=["none", "scalar", "binary"], default="none",
+                   help="컬렉션 벡터 양자화 방식 (scalar=int8, binary=1bit). 양자화 벡터는 RAM, 원본은 --on-disk 시 디스크")
+    p.add_argument("--on-disk", action="store_true", help="원본 float32 벡터를 디스크(mmap)에 저장")
+    p.add_argument("--recreate", action="store_true",
+                   help="기존 컬렉션을 지우고 다시 생성 (기본: 없을 때만 생성하고 같은 id는 덮어씀)")
+    p.add_argument("--incremental", action="store_true",
+                   help="Qdrant에 이미 있는 대화 쌍(같은 id)은 임베딩/업서트하지 않음")
+    # 임베딩 백엔드 (BE의 EMBEDDING_PROVIDER 설정과 같아야 함)
+    p.add_argument("--embedding-provider", choices=["openai", "local", "hashing"],
+                   default=os.getenv("EMBEDDING_PROVIDER", "openai"))
+    p.add_argument("--embedding-dimensions", type=int, default=None, help="openai: 모델 기본 차원 대신 사용할 차원")
+    p.add_argument("--embedding-model-path", default=os.getenv("LOCAL_EMBEDDING_MODEL_PATH", "models/embedding"),
+                   help="local: sentence-transformers 모델 경로")
+    p.add_argument("--embedding-backend", choices=["torch", "onnx"], default="torch")
+    p.add_argument("--hashing-dim", type=int, default=int(os.getenv("HASHING_EMBEDDING_DIM", "256")))
+    # 임베딩 영구 캐시 (재실행 시 이미 임베딩한 텍스트는 다시 호출하지 않음)
+    p.add_argument("--embedding-cache", default=None,
+                   help="임베딩 캐시 SQLite 파일 (기본: <output-dir>/embedding_cache.sqlite3)")
+    p.add_argument("--no-embedding-cache", action="store_true", help="임베딩 캐시 사용 안 함")
+    p.add_argument("--embedding-price", type=float, default=None,
+                   help="1M 토큰당 USD (기본: 모델별 공시 요금, 캐시 절약 비용 계산용)")
+    p.add_argument("--compact-cache", action="store_true", help="임베딩 캐시를 정리(삭제 + VACUUM)하고 종료")
+    p.add_argument("--cache-max-age-days", type=float, default=None,
+                   help="--compact-cache: 이 기간 동안 쓰이지 않은 항목 삭제")
+    p.add_argument("--cache-current-model-only", action="store_true",
+                   help="--compact-cache: 현재 임베딩 provider/모델이 아닌 항목 삭제")
+    args = p.parse_args()
+    if args.incremental and (args.recreate or args.skip_qdrant):
+        p.error("--incremental은 기존 Qdrant 컬렉션을 기준으로 하므로 --recreate/--skip-qdrant와 함께 쓸 수 없습니다.")
+    if args.incremental and args.local_index_dir:
+        # 로컬 인덱스는 실행마다 전체를 새로 쓰므로 새 쌍만 쓰면 기존 내용이 사라짐
+        p.error("--incremental은 --local-index-dir와 함께 쓸 수 없습니다. (로컬 인덱스는 전체 실행으로 생성)")
+    return args
 
 
 # ───────────────── 1. 한 줄 파싱 ────────────────────────────────
-def parse_line(line: str):
+DATE_HEADER_RE = re.compile(r"-+\s*(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일")
+TIME_RE = re.compile(r"(오전|오후)\s*(\d{1,2}):(\d{2})")
+
+
+def parse_date_header(line: str):
+    """'--------------- 2023년 1월 5일 목요일 ---------------' → date (아니면 None)"""
+    m = DATE_HEADER_RE.match(line.strip())
+    if not m:
+        return None
+    year, month, day = map(int, m.groups())
+    return datetime(year, month, day, tzinfo=KAKAO_TZ)
+
+
+def parse_time(text: str, day):
+    """'오후 3:21' + 날짜 → datetime (날짜나 시각을 알 수 없으면 None)"""
+    m = TIME_RE.search(text)
+    if day is None or not m:
+        return None
+    ampm, hour, minute = m.group(1), int(m.group(2)) % 12, int(m.group(3))
+    if ampm == "오후":
+        hour += 12
+    return day.replace(hour=hour, minute=minute)
+
+
+def parse_line(line: str, day=None):
+    """'[보낸사람] [오후 3:21] 메시지' → (sender, message, timestamp ISO 문자열 또는 None)"""
     line = line.strip()
     if (not line or "카카오톡 대화" in line or "저장한 날짜" in line or line.startswith("---------------")):
         return None
-    m = re.match(r"\[([^]]+)]\s*\[[^]]+]\s*(.+)", line)
+    m = re.match(r"\[([^]]+)]\s*\[([^]]+)]\s*(.+)", line)
     if not m:
         return None
-    sender, message = m.groups()
+    sender, time_text, message = m.groups()
     if message == "이모티콘" or re.fullmatch(r"\(.*\)", message):
         return None
-    return sender.strip(), message.strip()
+    ts = parse_time(time_text, day)
+    return sender.strip(), message.strip(), ts.isoformat() if ts else None
 
 
-# ───────────────── 2. 파일 처리 ────────────────────────────────
-def preprocess_file(path: Path, encoding: str):
-    entries = []
-    try:
-        with path.open(encoding=encoding) as f:
-            for ln in f:
-                parsed = parse_line(ln)
-                if parsed:
-                    entries.append(parsed)
-    except Exception as e:
-        print(f"Error processing file {path}: {e}")
-        return []
-        
-    merged = [{"sender": s, "message": " ".join(m for _, m in grp)}
-              for s, grp in groupby(entries, key=lambda x: x[0])]
-    return merged
+# ───────────────── 2. 파일 처리 (스트리밍) ──────────────────────
+def iter_entries(path: Path, encoding: str):
+    """파일을 한 줄씩 읽어 (sender, message, timestamp)를 yield (날짜 구분선으로 날짜 추적)"""
+    day = None
+    with path.open(encoding=encoding) as f:
+        for ln in f:
+            header = parse_date_header(ln)
+            if header:
+                day = header
+                continue
+            parsed = parse_line(ln, day)
+            if parsed:
+                yield parsed
+
+
+def merge_entries(entries):
+    """연속된 같은 화자의 메시지를 합치고, 첫 메시지 시각을 묶음의 시각으로 사용 (화자가 바뀔 때마다 yield)"""
+    for s, grp in groupby(entries, key=lambda x: x[0]):
+        first = next(grp)
+        messages = [first[1]] + [m for _, m, _ in grp]
+        yield {"sender": s, "message": " ".join(messages), "timestamp": first[2]}
+
+
+def iter_pairs(merged):
+    """상대 메시지 → 바로 다음 MAIN_SENDER 메시지를 질문–답변 쌍으로 yield"""
+    prev_other = None
+    for item in merged:
+        if item["sender"] == MAIN_SENDER:
+            if prev_other:
+                yield {
+                    "query_sender": prev_other["sender"],
+                    "query": prev_other["message"],
+                    "response_sender": item["sender"],
+                    "response": item["message"],
+                    "timestamp": item["timestamp"],
+                }
+            prev_other = None
+        else:
+            prev_other = item
+
+
+def batched(iterable, n):
+    """iterable을 n개씩 리스트로 묶어 yield (마지막 묶음은 n개 미만일 수 있음)"""
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+def normalize_text(text):
+    """id 계산용: NFC 정규화 + 공백 정리 (내보내기마다 달라지는 공백 차이를 같은 쌍으로 취급)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def pair_id(pair):
+    """상대(query_sender)와 정규화한 질문/답변/시각으로 만든 uuid5 → 같은 대화 쌍은 어느 실행에서든 같은 id"""
+    key = json.dumps([
+        normalize_text(pair["query_sender"]),
+        normalize_text(pair["query"]),
+        normalize_text(pair["response_sender"]),
+        normalize_text(pair["response"]),
+        pair.get("timestamp") or "",
+    ], ensure_ascii=False)
+    return str(uuid.uuid5(PAIR_ID_NAMESPACE, key))
 
 
 # ───────────────── 3. 벡터 임베딩 ───────────────────────────────
-def embed_texts(texts):
-    BATCH, vecs = 96, []
-    for i in range(0, len(texts), BATCH):
-        try:
-            resp = openai.embeddings.create(model=MODEL, input=texts[i:i + BATCH])
-            vecs.extend([d.embedding for d in resp.data])
-        except Exception as e:
-            print(f"OpenAI API 호출 중 오류 발생 (batch {i}): {e}")
-            # 해당 배치의 벡터는 비어있는 리스트로 채워 오류가 난 부분을 표시할 수 있습니다.
-            # 또는 text 수만큼 None으로 채울 수도 있습니다.
-            # 여기서는 API 실패시 프로그램이 중단되도록 re-raise 합니다.
-            raise e
-    return vecs
+def create_embedder(args, provider: EmbeddingProvider, store: EmbeddingStore = None):
+    """provider 호출을 동시 요청 수/RPM/TPM 한도와 재시도로 감싼 비동기 임베딩 실행기"""
+    return AsyncEmbedder(
+        provider, store,
+        max_in_flight=args.max_in_flight,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        max_retries=args.max_retries,
+        base_delay=args.retry_base_delay,
+        max_delay=args.retry_max_delay,
+        max_consecutive_failures=args.max_consecutive_failures,
+    )
 
 
 # ───────────────── 4. Qdrant 업서트 ────────────────────────────
-def upsert_pairs_to_qdrant(pairs, host, port, col, batch_size=200):
-    if not pairs:
-        print("⚠️  업서트할 쌍이 없습니다."); return
+def pair_payload(pair):
+    """Qdrant 포인트와 로컬 인덱스가 공유하는 payload"""
+    payload = {
+        "content": pair["response"],
+        "query_sender": pair["query_sender"],
+        "response_sender": pair["response_sender"]
+    }
+    if pair.get("timestamp"):
+        payload["timestamp"] = pair["timestamp"]  # RFC 3339 (datetime 인덱스)
+    return payload
 
-    client = QdrantClient(host=host, port=port, https=False, timeout=30.0)
 
-    print("Vectize Text...")
-    vectors = embed_texts([p["query"] for p in pairs])
-    vector_dim = len(vectors[0])
+def quantization_config(mode):
+    """--quantization 값을 Qdrant 양자화 설정으로 변환 (양자화 벡터는 항상 RAM에 유지)"""
+    if mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def create_payload_indexes(client, col):
+    """화자/시각 필터를 서버에서 처리할 수 있도록 payload 인덱스 생성"""
+    for field, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(collection_name=col, field_name=field, field_schema=schema, wait=True)
+    print(f"🔎 payload 인덱스 생성: {', '.join(PAYLOAD_INDEXES)}")
 
-    print(f"🔄 컬렉션 '{col}'을(를) 다시 생성합니다. (dim={vector_dim})")
-    client.recreate_collection(
-        collection_name=col,
-        vectors_config=VectorParams(size=vector_dim, distance=Distance.COSINE)
-    )
 
-    print(f"📦 총 {len(pairs)}건 → {batch_size}개씩 업서트 중...")
-    for idx in range(0, len(pairs), batch_size):
-        batch_pairs = pairs[idx:idx + batch_size]
-        batch_vectors = vectors[idx:idx + batch_size]
+class QdrantSink:
+    """
+    컬렉션을 준비하고, 임베딩된 배치를 도착하는 대로 업서트합니다.
+    - 기본: 컬렉션이 없을 때만 생성 (BE가 서비스 중인 컬렉션을 지우지 않음)
+    - recreate=True: 기존 컬렉션을 지우고 다시 생성
+    """
+
+    def __init__(self, host, port, col, vector_dim, quantization="none", on_disk=False, recreate=False):
+        self.client = QdrantClient(host=host, port=port, https=False, timeout=30.0)
+        self.col = col
+        self.count = 0
+        self.failed = 0
+
+        vectors_config = VectorParams(size=vector_dim, distance=Distance.COSINE, on_disk=on_disk)
+        if recreate:
+            print(f"🔄 컬렉션 '{col}'을(를) 다시 생성합니다. (dim={vector_dim}, quantization={quantization}, on_disk={on_disk})")
+            self.client.recreate_collection(
+                collection_name=col,
+                vectors_config=vectors_config,
+                quantization_config=quantization_config(quantization),
+            )
+        elif self.client.collection_exists(col):
+            info = self.client.get_collection(col)
+            size = info.config.params.vectors.size
+            if size != vector_dim:
+                raise ValueError(
+                    f"컬렉션 '{col}'의 벡터 차원({size})이 임베딩 차원({vector_dim})과 다릅니다. --recreate로 다시 생성하세요."
+                )
+            print(f"➕ 기존 컬렉션 '{col}'에 업서트합니다. (dim={vector_dim})")
+            self._update_storage(info, quantization, on_disk)
+        else:
+            print(f"🆕 컬렉션 '{col}'을(를) 생성합니다. (dim={vector_dim}, quantization={quantization}, on_disk={on_disk})")
+            self.client.create_collection(
+                collection_name=col,
+                vectors_config=vectors_config,
+                quantization_config=quantization_config(quantization),
+            )
+        create_payload_indexes(self.client, col)
 
+    def _update_storage(self, info, quantization, on_disk):
+        """기존 컬렉션에 --quantization/--on-disk를 명시했으면 update_collection으로 반영 (기본값이면 현재 설정 유지)"""
+        current = {ScalarQuantization: "scalar", BinaryQuantization: "binary"}.get(type(info.config.quantization_config), "none")
+        if quantization != "none" and quantization != current:
+            self.client.update_collection(collection_name=self.col, quantization_config=quantization_config(quantization))
+            print(f"🔧 컬렉션 양자화 변경: {current} → {quantization}")
+        if on_disk and not info.config.params.vectors.on_disk:
+            # 이름 없는 기본 벡터는 "" 키로 지정
+            self.client.update_collection(collection_name=self.col, vectors_config={"": VectorParamsDiff(on_disk=True)})
+            print("🔧 원본 벡터를 디스크(on_disk)로 이동")
+
+    def existing_ids(self, ids):
+        """ids 중 이미 컬렉션에 있는 id 집합 (payload/벡터 없이 한 번의 retrieve로 확인)"""
+        if not ids:
+            return set()
+        points = self.client.retrieve(collection_name=self.col, ids=ids, with_payload=False, with_vectors=False)
+        return {str(p.id) for p in points}
+
+    def write(self, pairs, vectors, ids) -> int:
+        """업서트하고 실패한 행 수를 반환 (배치 단위로 실패하므로 0 또는 len(pairs))"""
         points = [
-            PointStruct(
-                id=str(uuid.uuid4()),
-                vector=batch_vectors[i],
-                payload={
-                    "content": batch_pairs[i]["response"],
-                    "query_sender": batch_pairs[i]["query_sender"],
-                    "response_sender": batch_pairs[i]["response_sender"]
-                }
-            ) for i in range(len(batch_pairs))
+            PointStruct(id=pid, vector=vec.tolist(), payload=pair_payload(pair))
+            for pid, vec, pair in zip(ids, vectors, pairs)
         ]
         try:
-            client.upsert(collection_name=col, points=points)
-            print(f"  ✅ {idx + len(points):>5}/{len(pairs)} 완료")
+            self.client.upsert(collection_name=self.col, points=points)
+            self.count += len(points)
+            return 0
         except Exception as e:
-            print(f"  ❌ batch {idx} 실패: {e}")
+            self.failed += len(points)
+            print(f"  ❌ batch 업서트 실패 ({len(points)}건): {e}")
+            return len(points)
+
+    def close(self):
+        print(f"🎉 전체 업서트 완료 ({self.count}건, 실패 {self.failed}건)")
+        self.client.close()
+
+    def abort(self):
+        print(f"⚠️ 업서트 중단 ({self.count}건까지 반영됨)")
+        self.client.close()
+
+
+# ───────────────── 4-1. 로컬 벡터 인덱스 저장 ──────────────────
+class LocalIndexWriter:
+    """
+    BE의 LocalVectorIndex가 memory-map으로 읽는 형식으로 배치마다 이어 씁니다.
+    - vectors.f32   : L2 정규화된 float32 행렬 (row-major)
+    - payloads.jsonl: 줄마다 {"id", "payload"} (Qdrant와 같은 id/payload)
+    - meta.json     : dim, count, model (close 시 기록)
+    실행 중에는 같은 디렉토리의 *.tmp 파일에 쓰고 close()에서 교체하므로,
+    BE가 읽고 있는 기존 인덱스는 실행이 끝날 때까지(실패하면 그대로) 유지됩니다.
+    """
 
-    print(f"🎉 전체 업서트 완료 ({len(pairs)}건)")
+    FILES = ("vectors.f32", "payloads.jsonl", "meta.json")  # 교체 순서 (meta.json을 마지막에)
 
+    def __init__(self, out_dir: Path, dim: int, model: str):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        self.out_dir, self.dim, self.model = out_dir, dim, model
+        self.count = 0
+        self._lock = threading.Lock()  # 업서트 워커 여러 개가 동시에 써도 벡터/payload 행 순서가 어긋나지 않도록
+        self._vectors = self._tmp("vectors.f32").open("wb")
+        self._payloads = self._tmp("payloads.jsonl").open("w", encoding="utf-8")
 
-# ───────────────── 5. 단일 파일 처리 로직 ────────────────────────
-def process_single_file(txt_path, encoding, out_dir):
-    """단일 .txt 파일을 처리하고, 대화 쌍을 추출합니다."""
-    merged = preprocess_file(txt_path, encoding)
-    if not merged:
-        return [], txt_path.name
+    def _tmp(self, name):
+        return self.out_dir / f"{name}.tmp"
 
+    def write(self, pairs, vectors, ids) -> int:
+        arr = np.asarray(vectors, dtype=np.float32)
+        arr = arr / np.maximum(np.linalg.norm(arr, axis=1, keepdims=True), 1e-12)
+        lines = "".join(
+            json.dumps({"id": pid, "payload": pair_payload(pair)}, ensure_ascii=False) + "\n"
+            for pid, pair in zip(ids, pairs)
+        )
+        with self._lock:
+            arr.tofile(self._vectors)
+            self._payloads.write(lines)
+            self.count += len(arr)
+        return 0
+
+    def close(self):
+        self._vectors.close()
+        self._payloads.close()
+        meta = {"dim": self.dim, "count": self.count, "model": self.model}
+        self._tmp("meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        for name in self.FILES:
+            os.replace(self._tmp(name), self.out_dir / name)
+        print(f"💾 로컬 벡터 인덱스 저장 완료: {self.out_dir} (count={self.count}, dim={self.dim})")
+
+    def abort(self):
+        """실패 시 임시 파일만 지우고 기존 인덱스는 그대로 둠"""
+        self._vectors.close()
+        self._payloads.close()
+        for name in self.FILES:
+            self._tmp(name).unlink(missing_ok=True)
+        print(f"🗑️ 로컬 벡터 인덱스 임시 파일 삭제 (기존 인덱스 유지): {self.out_dir}")
+
+
+# ───────────────── 5. 파일별 대화 쌍 스트림 ─────────────────────
+def iter_file_pairs(txt_path: Path, encoding: str, out_dir: Path):
+    """
+    단일 .txt 파일에서 대화 쌍을 하나씩 yield 합니다.
+    병합 결과는 목록으로 모으지 않고 {stem}.json 배열에 한 항목씩 기록합니다.
+    """
     out_path = out_dir / f"{txt_path.stem}.json"
-    out_path.write_text(json.dumps(merged, ensure_ascii=False, indent=2), encoding="utf-8")
-    
-    pairs, prev_other = [], None
-    for item in merged:
-        if item["sender"] == MAIN_SENDER:
-            if prev_other:
-                pairs.append({
-                    "query_sender": prev_other["sender"],
-                    "query": prev_other["message"],
-                    "response_sender": item["sender"],
-                    "response": item["message"]
-                })
-            prev_other = None
-        else:
-            prev_other = item
-            
+    lines = pairs = 0
+    with out_path.open("w", encoding="utf-8") as out:
+        out.write("[")
+
+        def _recorded(merged):
+            nonlocal lines
+            for item in merged:
+                out.write(("," if lines else "") + "\n  " + json.dumps(item, ensure_ascii=False))
+                lines += 1
+                yield item
+
+        for pair in iter_pairs(_recorded(merge_entries(iter_entries(txt_path, encoding)))):
+            if pairs < 5:
+                print(f"   • [{txt_path.name}] Q: {pair['query'][:40]}... -> A: {pair['response'][:40]}...")
+            pairs += 1
+            yield pair
+        out.write("\n]\n")
+
     # 디버그 로그
-    print(f"\n📄 {txt_path.name} → {out_path} (lines={len(merged)})")
+    print(f"\n📄 {txt_path.name} → {out_path} (lines={lines})")
     print(f"[DEBUG] MAIN_SENDER                 : '{MAIN_SENDER}'")
-    print(f"[DEBUG] merged total lines          : {len(merged)}")
-    print(f"[DEBUG] matched query–response pairs: {len(pairs)}")
-    for sample in islice(pairs, 0, 5):
-        print(f"   • Q: {sample['query'][:40]}... -> A: {sample['response'][:40]}...")
+    print(f"[DEBUG] merged total lines          : {lines}")
+    print(f"[DEBUG] matched query–response pairs: {pairs}")
+
+
+_FILE_DONE = object()
+
+
+def iter_all_pairs(txt_files, encoding, out_dir, max_workers, queue_size):
+    """
+    여러 파일을 스레드로 나눠 파싱하고, 대화 쌍을 크기가 제한된 큐로 하나씩 전달합니다.
+    큐가 가득 차면 파싱 스레드가 기다리므로 대기 중인 쌍은 queue_size개를 넘지 않습니다.
+    """
+    q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(path):
+        try:
+            for pair in iter_file_pairs(path, encoding, out_dir):
+                if not _put(pair):
+                    return
+            print(f"'{path.name}' 처리 완료.")
+        except Exception as exc:
+            print(f"'{path.name}' 처리 중 예외 발생: {exc}")
+        finally:
+            _put(_FILE_DONE)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        print(f"{max_workers}개의 스레드로 병렬 처리 시작...")
+        for path in txt_files:
+            executor.submit(_worker, path)
+        remaining = len(txt_files)
+        try:
+            while remaining:
+                item = q.get()
+                if item is _FILE_DONE:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            # 소비 쪽이 중간에 멈춰도(임베딩 실패 등) 파싱 스레드가 큐에서 영원히 기다리지 않도록 중단
+            stop.set()
+
+
+def peak_rss_mb():
+    """프로세스 최대 RSS (MB), resource 모듈이 없는 플랫폼(Windows)에서는 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # macOS는 bytes, Linux는 KB
+
+# ───────────────── 5-1. 임베딩/업서트 파이프라인 ─────────────────
+class StageStats:
+    """단계별 처리량 (워커 busy 시간 합계와 첫 시작~마지막 종료 구간)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.pairs = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.first = None
+        self.last = None
+
+    def record(self, start, end, pairs, failed=0):
+        self.pairs += pairs
+        self.failed += failed
+        self.busy += end - start
+        self.first = start if self.first is None else min(self.first, start)
+        self.last = end if self.last is None else max(self.last, end)
+
+    def summary(self):
+        active = (self.last - self.first) if self.first is not None else 0.0
+        rate = self.pairs / active if active else 0.0
+        line = f"{self.name:<7} {self.pairs:>8}쌍  active {active:7.1f}s  busy {self.busy:7.1f}s  {rate:9.1f} pairs/s"
+        return line + (f"  (실패 {self.failed}쌍)" if self.failed else "")
+
+
+class OrderedProgress:
+    """배치가 순서와 상관없이 끝나도, 앞에서부터 빈틈없이 끝난 배치까지만 순서대로 출력"""
+
+    def __init__(self):
+        self.done = {}
+        self.next_seq = 0
+        self.total = 0
+        self.skipped = 0
+        self.failed = 0
+        self.upsert_failed = 0
+
+    def complete(self, seq, pairs, skipped=0, failed=0, upsert_failed=0):
+        self.done[seq] = (pairs, skipped, failed, upsert_failed)
+        while self.next_seq in self.done:
+            pairs, skipped, failed, upsert_failed = self.done.pop(self.next_seq)
+            self.total += pairs
+            self.skipped += skipped
+            self.failed += failed
+            self.upsert_failed += upsert_failed
+            self.next_seq += 1
+            note = f" (기존/중복 {self.skipped}쌍 건너뜀)" if self.skipped else ""
+            if self.failed:
+                note += f" (임베딩 실패 {self.failed}쌍)"
+            if self.upsert_failed:
+                note += f" (업서트 실패 {self.upsert_failed}쌍)"
+            print(f"📦 batch {self.next_seq}: 누적 {self.total}쌍 임베딩/저장 완료{note}")
+
+
+async def run_pipeline(batches, embedder, sinks, embed_workers, upsert_workers, queue_batches, existing_ids=None):
+    """
+    배치 스트림을 [읽기] → [임베딩 N개] → [업서트 M개] 단계로 동시에 흘려보냅니다.
+    - 단계 사이 큐는 크기가 제한되어 있어 뒤 단계가 느리면 앞 단계가 기다립니다. (backpressure)
+    - 임베딩은 AsyncEmbedder가 한도 안에서 비동기로, 업서트는 동기 클라이언트를 스레드에서 실행해
+      OpenAI와 Qdrant 네트워크가 동시에 바쁘게 유지됩니다.
+    - existing_ids(ids) → set 이 주어지면 임베딩 전에 배치 단위로 이미 저장된 쌍을 걸러냅니다. (--incremental)
+    - sinks는 순서대로 쓰고, 한 sink가 배치를 거부하면 뒤 sink에는 쓰지 않습니다.
+      (Qdrant를 앞에 두면 로컬 인덱스에는 Qdrant에 저장된 쌍만 남음)
+    """
+    embed_q = asyncio.Queue(maxsize=queue_batches)
+    upsert_q = asyncio.Queue(maxsize=queue_batches)
+    names = ("read", "check", "embed", "upsert") if existing_ids else ("read", "embed", "upsert")
+    stats = {name: StageStats(name) for name in names}
+    progress = OrderedProgress()
+    it = iter(batches)
+
+    async def _produce():
+        seq = 0
+        while True:
+            start = time.perf_counter()
+            batch = await asyncio.to_thread(next, it, None)
+            if batch is None:
+                break
+            stats["read"].record(start, time.perf_counter(), len(batch))
+            await embed_q.put((seq, batch))
+            seq += 1
+        for _ in range(embed_workers):
+            await embed_q.put(None)
+
+    async def _embed_worker():
+        while (item := await embed_q.get()) is not None:
+            seq, batch = item
+            # 같은 배치 안의 중복 쌍은 한 번만 임베딩 (같은 id면 어차피 한 포인트로 저장됨)
+            by_id = {pair_id(p): p for p in batch}
+            skipped = len(batch) - len(by_id)
+            if existing_ids:
+                start = time.perf_counter()
+                found = await asyncio.to_thread(existing_ids, list(by_id))
+                stats["check"].record(start, time.perf_counter(), len(by_id))
+                for pid in found:
+                    by_id.pop(pid, None)
+                skipped += len(found)
+            if not by_id:
+                progress.complete(seq, 0, skipped)
+                continue
+            ids, batch = list(by_id), list(by_id.values())
+            start = time.perf_counter()
+            vectors, failed = await embedder.embed([p["query"] for p in batch])
+            if failed:
+                # 실패한 쌍은 저장하지 않음 (다음 실행에서 --incremental/임베딩 캐시로 나머지만 다시 처리)
+                keep = [i for i in range(len(batch)) if i not in failed]
+                ids, batch, vectors = [ids[i] for i in keep], [batch[i] for i in keep], vectors[keep]
+            stats["embed"].record(start, time.perf_counter(), len(batch))
+            if not batch:
+                progress.complete(seq, 0, skipped, len(failed))
+                continue
+            await upsert_q.put((seq, batch, vectors, ids, skipped, len(failed)))
+
+    async def _embed_stage():
+        await asyncio.gather(*(_embed_worker() for _ in range(embed_workers)))
+        for _ in range(upsert_workers):
+            await upsert_q.put(None)
+
+    async def _upsert_worker():
+        while (item := await upsert_q.get()) is not None:
+            seq, batch, vectors, ids, skipped, failed = item
+            start = time.perf_counter()
+            lost = 0
+            for sink in sinks:
+                lost = await asyncio.to_thread(sink.write, batch, vectors, ids)
+                if lost:
+                    break
+            stored = len(batch) - lost
+            stats["upsert"].record(start, time.perf_counter(), stored, lost)
+            progress.complete(seq, stored, skipped, failed, lost)
+
+    tasks = [asyncio.create_task(_produce()), asyncio.create_task(_embed_stage())]
+    tasks += [asyncio.create_task(_upsert_worker()) for _ in range(upsert_workers)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # 한 단계가 실패하면(임베딩 오류 등) 나머지 워커가 큐에서 기다리지 않도록 모두 취소
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return progress.total, progress.skipped, progress.failed, progress.upsert_failed, progress.next_seq, stats
 
-    return pairs, txt_path.name
 
 # ───────────────── 6. 메인 로직 ────────────────────────────────
+async def _run_and_close(embedder, pipeline):
+    """파이프라인이 끝나면(실패 포함) 같은 이벤트 루프에서 비동기 클라이언트를 닫음"""
+    try:
+        return await pipeline
+    finally:
+        await embedder.aclose()
+
+
+def compact_cache(args, cache_path: Path):
+    """--compact-cache: 오래되었거나 다른 모델의 캐시 항목을 지우고 파일 크기를 줄임"""
+    if not cache_path.exists():
+        print(f"임베딩 캐시 파일이 없습니다: {cache_path}")
+        return
+    keep_model = None
+    if args.cache_current_model_only:
+        keep_model = create_provider(
+            args.embedding_provider,
+            model=MODEL,
+            dimensions=args.embedding_dimensions,
+            model_path=args.embedding_model_path,
+            backend=args.embedding_backend,
+            hashing_dim=args.hashing_dim,
+        ).name
+    store = EmbeddingStore(cache_path)
+    try:
+        deleted, before, after = store.compact(args.cache_max_age_days, keep_model)
+    finally:
+        store.close()
+    print(f"🧹 임베딩 캐시 정리: {cache_path} ({deleted}건 삭제, {before / 1e6:.1f} MB → {after / 1e6:.1f} MB)")
+
+
 def main():
     args = get_args()
     in_dir, out_dir = Path(args.input_dir), Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = Path(args.embedding_cache) if args.embedding_cache else out_dir / "embedding_cache.sqlite3"
+
+    if args.compact_cache:
+        compact_cache(args, cache_path)
+        return
 
     txt_files = list(in_dir.glob("*.txt"))
     if not txt_files:
         print(f"입력 디렉토리 '{in_dir}'에 .txt 파일이 없습니다.")
         return
 
-    all_pairs = []
-    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
-        print(f"{args.max_workers}개의 스레드로 병렬 처리 시작...")
-        
-        future_to_file = {
-            executor.submit(process_single_file, txt, args.encoding, out_dir): txt 
-            for txt in txt_files
-        }
+    provider = create_provider(
+        args.embedding_provider,
+        model=MODEL,
+        dimensions=args.embedding_dimensions,
+        model_path=args.embedding_model_path,
+        backend=args.embedding_backend,
+        hashing_dim=args.hashing_dim,
+    )
+    print(f"임베딩 provider={provider.name}, dim={provider.dim}, batch={args.batch_size}")
+    store = None if args.no_embedding_cache else EmbeddingStore(cache_path)
+    if store:
+        print(f"임베딩 캐시: {cache_path}")
 
-        for future in as_completed(future_to_file):
-            try:
-                pairs, filename = future.result()
-                if pairs:
-                    all_pairs.extend(pairs)
-                print(f"'{filename}' 처리 완료.")
-            except Exception as exc:
-                filename = future_to_file[future].name
-                print(f"'{filename}' 처리 중 예외 발생: {exc}")
-    
+    # parse → merge → pair → embed batch → upsert batch
+    # 한 번에 메모리에 있는 대화 쌍은 (배치 크기 × 큐/워커 수 + 파싱 큐) 수준으로 입력 크기와 무관
+    start = time.perf_counter()
+    pairs_stream = iter_all_pairs(txt_files, args.encoding, out_dir, args.max_workers, queue_size=args.batch_size)
+    batches = batched(pairs_stream, args.batch_size)
+    total, skipped, failed, upsert_failed, n_batches, stats = 0, 0, 0, 0, 0, {}
+    embedder = create_embedder(args, provider, store)
+    sinks, existing_ids = [], None
+    try:
+        # 쌍이 하나도 없으면 기존 컬렉션/인덱스를 건드리지 않도록 첫 배치를 확인한 뒤 생성
+        first = next(batches, None)
+        if first is not None:
+            # Qdrant가 먼저: 업서트에 실패한 배치는 로컬 인덱스에도 쓰지 않아 두 저장소가 같은 쌍을 가짐
+            if not args.skip_qdrant:
+                qdrant = QdrantSink(
+                    args.qdrant_host, args.qdrant_port, args.collection, provider.dim,
+                    quantization=args.quantization, on_disk=args.on_disk, recreate=args.recreate,
+                )
+                sinks.append(qdrant)
+                if args.incremental:
+                    existing_ids = qdrant.existing_ids
+            if args.local_index_dir:
+                sinks.append(LocalIndexWriter(Path(args.local_index_dir), provider.dim, provider.name))
+            print(f"임베딩 워커 {args.embed_workers}개, 업서트 워커 {args.upsert_workers}개")
+            total, skipped, failed, upsert_failed, n_batches, stats = asyncio.run(_run_and_close(embedder, run_pipeline(
+                chain([first], batches), embedder, sinks,
+                args.embed_workers, args.upsert_workers, args.queue_batches, existing_ids=existing_ids,
+            )))
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    else:
+        for sink in sinks:
+            sink.close()
+    finally:
+        pairs_stream.close()
+        if store:
+            store.close()
+
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
     print("\n" + "="*50)
-    print(f"모든 파일 처리 완료. 총 {len(all_pairs)}개의 대화 쌍을 찾았습니다.")
+    if not total:
+        print("새로 업로드할 대화 쌍이 없습니다.")
+    print(f"파일 {len(txt_files)}개, 대화 쌍 {total}개, 배치 {n_batches}개, {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.1f} pairs/s)")
+    if skipped:
+        print(f"이미 저장된/중복 대화 쌍 {skipped}개는 임베딩하지 않고 건너뜀")
+    if failed:
+        print(f"⚠️ 임베딩에 실패한 대화 쌍 {failed}개는 저장하지 않음 (다시 실행하면 캐시/--incremental로 나머지만 처리)")
+    if upsert_failed:
+        print(f"⚠️ Qdrant 업서트에 실패한 대화 쌍 {upsert_failed}개는 저장하지 않음 (로컬 인덱스에도 쓰지 않음, 다시 실행하면 --incremental로 채움)")
+    for stage in stats.values():
+        print(stage.summary())
+    print(embedder.stats.summary())
+    if store:
+        price = args.embedding_price if args.embedding_price is not None else provider.price_per_1m
+        print(store.summary(price))
+    print(f"최대 메모리(peak RSS): {f'{peak:.1f} MB' if peak is not None else 'n/a'}")
     print("="*50 + "\n")
-
-    if all_pairs:
-        upsert_pairs_to_qdrant(
-            all_pairs,
-            host=args.qdrant_host,
-            port=args.qdrant_port,
-            col=args.collection
-        )
-    else:
-        print("Qdrant에 업로드할 대화 쌍이 없습니다.")
+    # 일부만 적재된 실행을 래퍼 스크립트가 알 수 있도록 실패가 있으면 0이 아닌 종료 코드
+    return 1 if failed or upsert_failed else 0
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        sys.exit(main())
+    except EmbeddingAborted as e:
+        print(f"❌ 임베딩 중단: {e}")
+        sys.exit(2)